@@ -0,0 +1,58 @@
+"""ON DELETE actions for lender, program, rule and match-result foreign keys
+
+delete_lender and delete_program issue a single DELETE and rely on the
+database to cascade, so databases created before the models declared these
+actions need their foreign keys recreated.
+
+Revision ID: 3f1c2a9b7d10
+Revises:
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9b7d10"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, referenced table, ON DELETE action)
+FOREIGN_KEYS = [
+    ("lender_programs", "lender_id", "lenders", "CASCADE"),
+    ("policy_rules", "program_id", "lender_programs", "CASCADE"),
+    ("match_results", "lender_id", "lenders", "CASCADE"),
+    ("match_results", "program_id", "lender_programs", "SET NULL"),
+]
+
+
+def _recreate_foreign_keys(on_delete: bool) -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    
+    for table, column, referent, action in FOREIGN_KEYS:
+        # A fresh database gets these tables (and actions) from create_all
+        if table not in tables:
+            continue
+        
+        # Drop whatever constraint covers the column, whatever it was named
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] == [column]:
+                op.drop_constraint(fk["name"], table, type_="foreignkey")
+        
+        ondelete: Optional[str] = action if on_delete else None
+        op.create_foreign_key(
+            f"{table}_{column}_fkey", table, referent, [column], ["id"], ondelete=ondelete
+        )
+
+
+def upgrade() -> None:
+    _recreate_foreign_keys(on_delete=True)
+
+
+def downgrade() -> None:
+    _recreate_foreign_keys(on_delete=False)
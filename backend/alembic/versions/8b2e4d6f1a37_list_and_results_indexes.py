@@ -0,0 +1,58 @@
+"""Composite indexes for the listings and the (parent_id, priority) loads
+
+create_all only creates indexes along with their tables, so databases that
+already existed when the models declared these indexes never got them.
+The (parent_id, priority) ones also index the foreign keys that the ON DELETE
+CASCADEs from 3f1c2a9b7d10 walk.
+
+Revision ID: 8b2e4d6f1a37
+Revises: 3f1c2a9b7d10
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b2e4d6f1a37"
+down_revision: Union[str, None] = "3f1c2a9b7d10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns) - must match the Index() declarations on the models
+INDEXES = [
+    ("ix_app_status_created", "loan_applications", ["status", sa.text("created_at DESC")]),
+    ("ix_match_app_elig_fit", "match_results", ["application_id", sa.text("is_eligible DESC"), sa.text("fit_score DESC")]),
+    ("ix_lender_active_name", "lenders", ["is_active", "name"]),
+    ("ix_program_lender_priority", "lender_programs", ["lender_id", "priority"]),
+    ("ix_rule_program_priority", "policy_rules", ["program_id", "priority"]),
+]
+
+
+def _existing_indexes() -> dict:
+    """{table: set of index names} for the tables that exist"""
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table: {ix["name"] for ix in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def upgrade() -> None:
+    existing = _existing_indexes()
+    for name, table, columns in INDEXES:
+        # A fresh database gets the table (and index) from create_all; a
+        # database built after the models declared it already has it
+        if table not in existing or name in existing[table]:
+            continue
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    existing = _existing_indexes()
+    for name, table, _ in reversed(INDEXES):
+        if name in existing.get(table, set()):
+            op.drop_index(name, table_name=table)
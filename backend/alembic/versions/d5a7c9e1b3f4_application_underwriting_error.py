@@ -0,0 +1,37 @@
+"""Record why an application's last underwriting run failed
+
+Revision ID: d5a7c9e1b3f4
+Revises: 8b2e4d6f1a37
+Create Date: 2026-10-16 00:00:00
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5a7c9e1b3f4"
+down_revision: Union[str, None] = "8b2e4d6f1a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table: str) -> Optional[set]:
+    """Column names of `table`, or None if it doesn't exist"""
+    inspector = sa.inspect(op.get_bind())
+    if table not in inspector.get_table_names():
+        return None
+    return {c["name"] for c in inspector.get_columns(table)}
+
+
+def upgrade() -> None:
+    columns = _columns("loan_applications")
+    # A fresh database gets the table (and column) from create_all
+    if columns is not None and "underwriting_error" not in columns:
+        op.add_column("loan_applications", sa.Column("underwriting_error", sa.String(500), nullable=True))
+
+
+def downgrade() -> None:
+    if "underwriting_error" in (_columns("loan_applications") or set()):
+        op.drop_column("loan_applications", "underwriting_error")
@@ -1,12 +1,18 @@
 """
 Applications API - CRUD operations for loan applications
 """
-from typing import List, Optional
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID, uuid4
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, lambda_stmt, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
-from app.database import get_db
+from app.database import AsyncSessionLocal, get_db
 from app.models import Borrower, Guarantor, LoanApplication, ApplicationStatus, MatchResult
 from app.schemas import (
     LoanApplicationCreate, LoanApplicationUpdate, LoanApplicationResponse,
@@ -17,120 +23,121 @@ from app.services.workflow import run_underwriting as run_underwriting_workflow
 router = APIRouter(prefix="/api/applications", tags=["applications"])
 
 
+def _with_borrower():
+    """Loader option for the nested borrower/guarantors in LoanApplicationResponse"""
+    return selectinload(LoanApplication.borrower).selectinload(Borrower.guarantors)
+
+
+async def _get_application(
+    db: AsyncSession,
+    application_id: UUID,
+    with_borrower: bool = True,
+) -> Optional[LoanApplication]:
+    if not with_borrower:
+        # Identity-map first; only SELECTs when the application isn't already loaded
+        return await db.get(LoanApplication, application_id)
+    # populate_existing so the eager loads also apply to an application already in the session
+    return await db.get(
+        LoanApplication, application_id, options=[_with_borrower()], populate_existing=True
+    )
+
+
 @router.post("", response_model=LoanApplicationResponse, status_code=status.HTTP_201_CREATED)
-def create_application(
+async def create_application(
     data: LoanApplicationCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new loan application with borrower and guarantor information.
     """
-    # Create borrower
-    borrower = Borrower(
-        business_name=data.borrower.business_name,
-        dba_name=data.borrower.dba_name,
-        industry=data.borrower.industry,
-        industry_naics=data.borrower.industry_naics,
-        state=data.borrower.state,
-        years_in_business=data.borrower.years_in_business,
-        annual_revenue=data.borrower.annual_revenue,
-        num_employees=data.borrower.num_employees,
-        num_trucks=data.borrower.num_trucks,
-        is_startup=data.borrower.is_startup,
-        is_homeowner=data.borrower.is_homeowner,
-        is_us_citizen=data.borrower.is_us_citizen,
-    )
+    # Ids are generated client-side so the whole graph goes out in one flush at commit
+    borrower = Borrower(id=uuid4(), **data.borrower.model_dump(exclude={"guarantors"}))
     db.add(borrower)
-    db.flush()
     
     # Create guarantors
-    for g_data in data.borrower.guarantors:
-        guarantor = Guarantor(
-            borrower_id=borrower.id,
-            first_name=g_data.first_name,
-            last_name=g_data.last_name,
-            ownership_percentage=g_data.ownership_percentage,
-            fico_score=g_data.fico_score,
-            fico_source=g_data.fico_source,
-            is_homeowner=g_data.is_homeowner,
-            years_at_residence=g_data.years_at_residence,
-            has_bankruptcy=g_data.has_bankruptcy,
-            bankruptcy_type=g_data.bankruptcy_type,
-            bankruptcy_discharge_date=g_data.bankruptcy_discharge_date,
-            has_judgments=g_data.has_judgments,
-            has_foreclosure=g_data.has_foreclosure,
-            has_repossession=g_data.has_repossession,
-            has_tax_liens=g_data.has_tax_liens,
-            has_collections_recent=g_data.has_collections_recent,
-            revolving_credit_limit=g_data.revolving_credit_limit,
-            revolving_credit_balance=g_data.revolving_credit_balance,
-            revolving_available_pct=g_data.revolving_available_pct,
-            has_cdl=g_data.has_cdl,
-            cdl_years=g_data.cdl_years,
-            cdl_class=g_data.cdl_class,
-        )
-        db.add(guarantor)
+    db.add_all([
+        Guarantor(borrower_id=borrower.id, **g_data.model_dump())
+        for g_data in data.borrower.guarantors
+    ])
     
     # Create application
     application = LoanApplication(
+        id=uuid4(),
         borrower_id=borrower.id,
-        amount_requested=data.application.amount_requested,
-        term_months=data.application.term_months,
-        down_payment_pct=data.application.down_payment_pct,
-        equipment_type=data.application.equipment_type,
-        equipment_description=data.application.equipment_description,
-        equipment_year=data.application.equipment_year,
-        equipment_age_years=data.application.equipment_age_years,
-        equipment_mileage=data.application.equipment_mileage,
-        equipment_hours=data.application.equipment_hours,
-        equipment_condition=data.application.equipment_condition,
-        is_private_party_sale=data.application.is_private_party_sale,
-        is_titled_asset=data.application.is_titled_asset,
-        is_refinance=data.application.is_refinance,
-        is_sale_leaseback=data.application.is_sale_leaseback,
-        paynet_score=data.application.paynet_score,
-        has_comparable_credit=data.application.has_comparable_credit,
-        comparable_credit_amount=data.application.comparable_credit_amount,
-        comparable_credit_pct=data.application.comparable_credit_pct,
         status=ApplicationStatus.DRAFT,
+        **data.application.model_dump(),
     )
     db.add(application)
-    db.commit()
-    db.refresh(application)
+    application_id = application.id
+    await db.commit()
     
-    return application
+    return await _get_application(db, application_id)
+
+
+def _encode_cursor(application: LoanApplication) -> str:
+    """Opaque keyset cursor pointing just past the given application"""
+    raw = f"{application.created_at.isoformat()}|{application.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, application_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(application_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
 
 
 @router.get("", response_model=List[LoanApplicationResponse])
-def list_applications(
+async def list_applications(
+    response: Response,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all loan applications with optional status filter.
+    
+    Pages are keyset-paginated on (created_at, id): pass the X-Next-Cursor
+    header from one page as `cursor` to fetch the next. `skip` still works
+    for callers that don't use cursors, but gets slower with page depth.
     """
-    query = db.query(LoanApplication)
+    # lambda_stmt caches statement construction as well as compilation
+    query = lambda_stmt(lambda: select(LoanApplication).options(_with_borrower()))
     
     if status:
-        query = query.filter(LoanApplication.status == status)
+        query += lambda q: q.where(LoanApplication.status == status)
+    
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        query += lambda q: q.where(
+            tuple_(LoanApplication.created_at, LoanApplication.id) < tuple_(cursor_created_at, cursor_id)
+        )
+    elif skip:
+        query += lambda q: q.offset(skip)
     
-    applications = query.order_by(LoanApplication.created_at.desc()).offset(skip).limit(limit).all()
+    query += lambda q: q.order_by(LoanApplication.created_at.desc(), LoanApplication.id.desc()).limit(limit)
+    applications = (await db.scalars(query)).all()
+    
+    if len(applications) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(applications[-1])
     return applications
 
 
 @router.get("/{application_id}", response_model=LoanApplicationResponse)
-def get_application(
+async def get_application(
     application_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific loan application by ID.
     """
-    application = db.query(LoanApplication).filter(
-        LoanApplication.id == application_id
-    ).first()
+    application = await _get_application(db, application_id)
     
     if not application:
         raise HTTPException(
@@ -142,17 +149,15 @@ def get_application(
 
 
 @router.put("/{application_id}", response_model=LoanApplicationResponse)
-def update_application(
+async def update_application(
     application_id: UUID,
     data: LoanApplicationUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a loan application.
     """
-    application = db.query(LoanApplication).filter(
-        LoanApplication.id == application_id
-    ).first()
+    application = await _get_application(db, application_id)
     
     if not application:
         raise HTTPException(
@@ -165,23 +170,21 @@ def update_application(
     for field, value in update_data.items():
         setattr(application, field, value)
     
-    db.commit()
-    db.refresh(application)
+    await db.commit()
     
+    # Already loaded with its borrower; no need to re-SELECT after commit
     return application
 
 
 @router.delete("/{application_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_application(
+async def delete_application(
     application_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a loan application.
     """
-    application = db.query(LoanApplication).filter(
-        LoanApplication.id == application_id
-    ).first()
+    application = await _get_application(db, application_id, with_borrower=False)
     
     if not application:
         raise HTTPException(
@@ -189,23 +192,23 @@ def delete_application(
             detail=f"Application {application_id} not found"
         )
     
-    db.delete(application)
-    db.commit()
+    await db.delete(application)
+    await db.commit()
 
 
-@router.post("/{application_id}/underwrite")
-def run_underwriting(
+@router.post("/{application_id}/underwrite", status_code=status.HTTP_202_ACCEPTED)
+async def run_underwriting(
     application_id: UUID,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Run underwriting on a loan application.
-    Evaluates the application against all active lenders.
+    Queue underwriting for a loan application.
+    Evaluates the application against all active lenders in the background;
+    poll GET /{application_id}/results until status is no longer "underwriting".
     """
     # Verify application exists
-    application = db.query(LoanApplication).filter(
-        LoanApplication.id == application_id
-    ).first()
+    application = await _get_application(db, application_id, with_borrower=False)
     
     if not application:
         raise HTTPException(
@@ -213,29 +216,74 @@ def run_underwriting(
             detail=f"Application {application_id} not found"
         )
     
-    # Run underwriting
-    result = run_underwriting_workflow(str(application_id))
+    # Mark as underwriting up front so pollers never see stale results as final;
+    # a failed run restores the status it had before
+    previous_status = application.status
+    application.status = ApplicationStatus.UNDERWRITING
+    application.underwriting_error = None
+    await db.commit()
     
-    if "error" in result:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=result["error"]
-        )
+    # Sync workflow - Starlette runs it in the threadpool after the response is sent
+    background_tasks.add_task(run_underwriting_workflow, str(application_id), previous_status)
     
-    return result
+    return {
+        "application_id": str(application_id),
+        "status": "queued",
+    }
+
+
+def _results_query(application_id: UUID):
+    # lender/program are many-to-one, so joining them in costs no extra rows;
+    # id breaks fit_score ties so /results and /results/stream agree on order
+    return lambda_stmt(
+        lambda: select(MatchResult)
+        .where(MatchResult.application_id == application_id)
+        .options(joinedload(MatchResult.lender), joinedload(MatchResult.program))
+        .order_by(MatchResult.is_eligible.desc(), MatchResult.fit_score.desc(), MatchResult.id)
+    )
+
+
+async def _count_results(db: AsyncSession, application_id: UUID) -> Tuple[int, int]:
+    """(total, eligible) match counts for an application, aggregated in SQL"""
+    total, eligible_count = (await db.execute(
+        select(func.count(), func.count().filter(MatchResult.is_eligible == True))
+        .where(MatchResult.application_id == application_id)
+    )).one()
+    return total, eligible_count
+
+
+def _match_result_response(r: MatchResult) -> MatchResultResponse:
+    # Fields come from typed DB columns, so skip per-row validation
+    return MatchResultResponse.model_construct(
+        id=r.id,
+        application_id=r.application_id,
+        lender_id=r.lender_id,
+        program_id=r.program_id,
+        is_eligible=r.is_eligible,
+        fit_score=r.fit_score,
+        evaluation_details=r.evaluation_details,
+        created_at=r.created_at,
+        lender_name=r.lender.name if r.lender else None,
+        program_name=r.program.name if r.program else None,
+    )
 
 
 @router.get("/{application_id}/results", response_model=UnderwritingResultsResponse)
-def get_results(
+async def get_results(
     application_id: UUID,
-    db: Session = Depends(get_db)
+    summary: bool = False,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get underwriting results for a loan application.
+    
+    If the last run failed, `error` says why; `status` and `results` are
+    then those from before that run.
+    
+    With `summary=true` only the counts and best match are returned
+    (`results` is empty), without loading every match row.
     """
-    application = db.query(LoanApplication).filter(
-        LoanApplication.id == application_id
-    ).first()
+    application = await _get_application(db, application_id, with_borrower=False)
     
     if not application:
         raise HTTPException(
@@ -243,36 +291,93 @@ def get_results(
             detail=f"Application {application_id} not found"
         )
     
-    results = db.query(MatchResult).filter(
-        MatchResult.application_id == application_id
-    ).order_by(MatchResult.is_eligible.desc(), MatchResult.fit_score.desc()).all()
+    if summary:
+        total, eligible_count = await _count_results(db, application_id)
+        best = (await db.scalars(
+            _results_query(application_id) + (lambda q: q.where(MatchResult.is_eligible == True).limit(1))
+        )).first()
+        return UnderwritingResultsResponse(
+            application_id=application_id,
+            status=application.status,
+            total_lenders=total,
+            eligible_count=eligible_count,
+            ineligible_count=total - eligible_count,
+            best_match=_match_result_response(best) if best else None,
+            error=application.underwriting_error,
+        )
     
-    # Build response
-    eligible = [r for r in results if r.is_eligible]
-    ineligible = [r for r in results if not r.is_eligible]
-    best_match = eligible[0] if eligible else None
+    results = (await db.scalars(_results_query(application_id))).unique().all()
     
+    # Build response in one pass; rows are ordered eligible-first, so the
+    # best match (if any) is always the first one
+    eligible_count = 0
     result_responses = []
     for r in results:
-        result_responses.append(MatchResultResponse(
-            id=r.id,
-            application_id=r.application_id,
-            lender_id=r.lender_id,
-            program_id=r.program_id,
-            is_eligible=r.is_eligible,
-            fit_score=r.fit_score,
-            evaluation_details=r.evaluation_details,
-            created_at=r.created_at,
-            lender_name=r.lender.name if r.lender else None,
-            program_name=r.program.name if r.program else None,
-        ))
+        if r.is_eligible:
+            eligible_count += 1
+        result_responses.append(_match_result_response(r))
     
     return UnderwritingResultsResponse(
         application_id=application_id,
         status=application.status,
         total_lenders=len(results),
-        eligible_count=len(eligible),
-        ineligible_count=len(ineligible),
-        best_match=result_responses[0] if eligible else None,
+        eligible_count=eligible_count,
+        ineligible_count=len(results) - eligible_count,
+        best_match=result_responses[0] if eligible_count else None,
         results=result_responses,
+        error=application.underwriting_error,
     )
+
+
+@router.get("/{application_id}/results/stream")
+async def stream_results(
+    application_id: UUID,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream underwriting results as NDJSON.
+    
+    The first line is the summary (status and counts, without `results` or
+    `best_match`); every following line is one match result, in the same
+    order as `/results`. Rows are fetched from a server-side cursor, so
+    memory use doesn't grow with the number of lenders. The summary and rows
+    come from one snapshot, so a run that commits mid-stream isn't mixed in.
+    """
+    application = await _get_application(db, application_id, with_borrower=False)
+    
+    if not application:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Application {application_id} not found"
+        )
+    
+    async def generate():
+        # The request session may be closed once the handler returns, so the
+        # stream gets a session of its own. REPEATABLE READ pins one snapshot
+        # for the whole transaction, so the counts match the rows that follow
+        # even if an underwriting run replaces the results meanwhile.
+        async with AsyncSessionLocal() as stream_db:
+            await stream_db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+            current = await _get_application(stream_db, application_id, with_borrower=False)
+            if current is None:
+                # Deleted since the 404 check
+                return
+            total, eligible_count = await _count_results(stream_db, application_id)
+            summary = {
+                "application_id": application_id,
+                "status": current.status,
+                "total_lenders": total,
+                "eligible_count": eligible_count,
+                "ineligible_count": total - eligible_count,
+                "error": current.underwriting_error,
+            }
+            yield orjson.dumps(summary) + b"\n"
+            
+            rows = await stream_db.stream_scalars(
+                _results_query(application_id).execution_options(yield_per=200)
+            )
+            async for r in rows:
+                # asyncpg hands back its own UUID subclass, which orjson won't encode natively
+                yield orjson.dumps(_match_result_response(r).model_dump(), default=str) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
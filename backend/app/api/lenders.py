@@ -1,35 +1,112 @@
 """
 Lenders API - CRUD operations for lenders and their programs
 """
+import hashlib
 from typing import List, Optional
-from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from uuid import UUID, uuid4
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.database import get_db
+from app.engine import get_rule_types as registered_rule_types
 from app.models import Lender, LenderProgram, PolicyRule
 from app.schemas import (
     LenderCreate, LenderUpdate, LenderResponse, LenderSummary,
     LenderProgramCreate, LenderProgramUpdate, LenderProgramResponse,
     PolicyRuleCreate, PolicyRuleUpdate, PolicyRuleResponse
 )
-from app.config import get_settings
+from app.config import settings
+from app.services.cache import ListingCache
+from app.services.rate_limit import RateLimiter
 
 router = APIRouter(prefix="/api/lenders", tags=["lenders"])
 
+# Eager-load strategies for the nested response schemas. selectinload issues one
+# IN-query per level, so a lender tree costs the same round-trips for any size.
+PROGRAM_RULES = selectinload(LenderProgram.rules)
+LENDER_PROGRAMS_AND_RULES = selectinload(Lender.programs).selectinload(LenderProgram.rules)
+
+# Lender listings are read far more often than lenders change. Entries are dropped
+# on every lender/program write; with Redis configured they're shared across
+# workers and can live longer than the per-process fallback.
+_lender_list_cache = ListingCache("lender-list", ttl=30, local_ttl=5)
+
+# Each PDF parse costs a Gemini call; reject floods before the upload is touched
+_pdf_rate_limit = RateLimiter(
+    "parse-pdf", times=settings.pdf_parse_rate_limit, seconds=settings.pdf_parse_rate_window
+)
+
+
+async def _invalidate_lender_cache() -> None:
+    await _lender_list_cache.clear()
+
+
+async def _get_lender(db: AsyncSession, lender_id: UUID, with_programs: bool = False) -> Optional[Lender]:
+    if not with_programs:
+        # Identity-map first; only SELECTs when the lender isn't already loaded
+        return await db.get(Lender, lender_id)
+    # populate_existing so the eager loads also apply to a lender already in the session
+    return await db.get(Lender, lender_id, options=[LENDER_PROGRAMS_AND_RULES], populate_existing=True)
+
+
+async def _get_program(db: AsyncSession, program_id: UUID, with_rules: bool = False) -> Optional[LenderProgram]:
+    if not with_rules:
+        return await db.get(LenderProgram, program_id)
+    return await db.get(LenderProgram, program_id, options=[PROGRAM_RULES], populate_existing=True)
+
+
+def _wrap_rule_value(value):
+    """PolicyRule.value is JSONB; scalars and lists are stored as {"value": x}"""
+    return value if isinstance(value, dict) else {"value": value}
+
+
+def _rule_values(program_id: UUID, r_data: PolicyRuleCreate) -> dict:
+    return {
+        "program_id": program_id,
+        **r_data.model_dump(exclude={"value"}),
+        "value": _wrap_rule_value(r_data.value),
+    }
+
+
+def _etag(*parts) -> str:
+    """Weak ETag over the values a response is built from"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    304 response when the client's If-None-Match already has `etag`;
+    otherwise tag `response` and return None.
+    """
+    # Clients may cache, but must revalidate before reusing a copy
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or etag.removeprefix("W/") in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
 
 # ============== Utility Endpoints (must be before parameterized routes) ==============
 
 @router.get("/rule-types", response_model=List[str])
-def get_rule_types():
+async def get_rule_types(response: Response):
     """
     Get all supported rule types.
     """
-    from app.engine import EVALUATOR_REGISTRY
-    return list(EVALUATOR_REGISTRY.keys())
+    # Rule types only change when an evaluator is registered, so clients may cache the list
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return registered_rule_types()
 
 
-@router.post("/parse-pdf")
+@router.post("/parse-pdf", dependencies=[Depends(_pdf_rate_limit)])
 async def parse_pdf_guidelines(file: UploadFile = File(...)):
     """
     Parse a lender guideline PDF and extract rules using AI.
@@ -40,8 +117,6 @@ async def parse_pdf_guidelines(file: UploadFile = File(...)):
     from app.services.pdf_parser import parse_pdf
     from app.services.rule_extractor import extract_rules_from_text
     
-    settings = get_settings()
-    
     # Validate file type
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(
@@ -57,9 +132,10 @@ async def parse_pdf_guidelines(file: UploadFile = File(...)):
         )
     
     try:
-        # Read and parse PDF
-        pdf_bytes = await file.read()
-        pdf_data = parse_pdf(pdf_bytes)
+        # Starlette has already spooled the upload (to disk once it's large), so
+        # hand pdfplumber the file itself and parse off the event loop. Only the
+        # text goes to Gemini, so skip table extraction
+        pdf_data = await run_in_threadpool(parse_pdf, file.file, include_tables=False)
         
         # Extract rules using AI
         extracted = await extract_rules_from_text(
@@ -85,41 +161,60 @@ async def parse_pdf_guidelines(file: UploadFile = File(...)):
 # ============== Lender Endpoints ==============
 
 @router.get("", response_model=List[LenderSummary])
-def list_lenders(
+async def list_lenders(
+    request: Request,
+    response: Response,
     active_only: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all lenders.
+    
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    while the listing is unchanged.
     """
-    query = db.query(Lender)
+    # Read before querying, so a write that lands mid-query keeps this listing out of the cache
+    generation = await _lender_list_cache.generation()
+    cached = await _lender_list_cache.get(active_only, generation)
+    if cached is not None:
+        return _conditional(request, response, cached["etag"]) or cached["lenders"]
+    
+    # Count active programs in SQL rather than loading every program per lender,
+    # and select only the summary columns instead of hydrating Lender objects
+    program_count = func.count(LenderProgram.id).filter(LenderProgram.is_active == True)
+    query = (
+        select(Lender.id, Lender.name, Lender.short_name, Lender.is_active, program_count.label("program_count"))
+        .outerjoin(LenderProgram)
+        .group_by(Lender.id)
+    )
     
     if active_only:
-        query = query.filter(Lender.is_active == True)
+        query = query.where(Lender.is_active == True)
     
-    lenders = query.order_by(Lender.name).all()
+    rows = (await db.execute(query.order_by(Lender.name))).mappings().all()
     
-    return [
-        LenderSummary(
-            id=l.id,
-            name=l.name,
-            short_name=l.short_name,
-            is_active=l.is_active,
-            program_count=len([p for p in l.programs if p.is_active])
-        )
-        for l in lenders
-    ]
+    # Rows come straight from typed columns, so skip re-validation
+    lenders = [LenderSummary.model_construct(**row) for row in rows]
+    # Tag the listing by its own rows, so the cache can answer revalidations
+    etag = _etag(generation, *(tuple(row.values()) for row in rows))
+    await _lender_list_cache.set(active_only, {"etag": etag, "lenders": lenders}, generation)
+    return _conditional(request, response, etag) or lenders
 
 
 @router.get("/{lender_id}", response_model=LenderResponse)
-def get_lender(
+async def get_lender(
     lender_id: UUID,
-    db: Session = Depends(get_db)
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get a specific lender with all programs and rules.
+    
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    while the lender, its programs and rules are unchanged.
     """
-    lender = db.query(Lender).filter(Lender.id == lender_id).first()
+    lender = await _get_lender(db, lender_id, with_programs=True)
     
     if not lender:
         raise HTTPException(
@@ -127,89 +222,71 @@ def get_lender(
             detail=f"Lender {lender_id} not found"
         )
     
-    return lender
+    # Every write bumps updated_at on the row it touches, and ids catch deletes
+    parts = [lender.updated_at]
+    for program in lender.programs:
+        parts += [program.id, program.updated_at]
+        parts += [(rule.id, rule.updated_at) for rule in program.rules]
+    return _conditional(request, response, _etag(*parts)) or lender
 
 
 @router.post("", response_model=LenderResponse, status_code=status.HTTP_201_CREATED)
-def create_lender(
+async def create_lender(
     data: LenderCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new lender with optional programs and rules.
     """
-    # Check for duplicate name
-    existing = db.query(Lender).filter(Lender.name == data.name).first()
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Lender with name '{data.name}' already exists"
-        )
-    
-    # Create lender
-    lender = Lender(
-        name=data.name,
-        short_name=data.short_name,
-        description=data.description,
-        contact_name=data.contact_name,
-        contact_email=data.contact_email,
-        contact_phone=data.contact_phone,
-        website=data.website,
-        is_active=data.is_active,
+    duplicate_name = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Lender with name '{data.name}' already exists"
     )
+    
+    lender = Lender(id=uuid4(), **data.model_dump(exclude={"programs"}))
     db.add(lender)
-    db.flush()
-    
-    # Create programs
-    for p_data in data.programs:
-        program = LenderProgram(
-            lender_id=lender.id,
-            name=p_data.name,
-            description=p_data.description,
-            credit_tier=p_data.credit_tier,
-            min_loan_amount=p_data.min_loan_amount,
-            max_loan_amount=p_data.max_loan_amount,
-            max_term_months=p_data.max_term_months,
-            is_app_only=p_data.is_app_only,
-            requires_financials=p_data.requires_financials,
-            priority=p_data.priority,
-            is_active=p_data.is_active,
-        )
-        db.add(program)
-        db.flush()
-        
-        # Create rules
-        for r_data in p_data.rules:
-            rule = PolicyRule(
-                program_id=program.id,
-                rule_type=r_data.rule_type,
-                operator=r_data.operator,
-                value=r_data.value if isinstance(r_data.value, dict) else {"value": r_data.value},
-                description=r_data.description,
-                rejection_message=r_data.rejection_message,
-                is_required=r_data.is_required,
-                priority=r_data.priority,
-                weight=r_data.weight,
-                is_active=r_data.is_active,
-            )
-            db.add(rule)
-    
-    db.commit()
-    db.refresh(lender)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # The unique constraint on name is the duplicate check - no pre-check
+        # round-trip, and no window for a concurrent create to slip through
+        await db.rollback()
+        raise duplicate_name
+    
+    # Programs and rules go in as plain rows - one executemany INSERT per table,
+    # with program ids assigned here so rules can reference them
+    program_rows = [
+        {"id": uuid4(), "lender_id": lender.id, **p_data.model_dump(exclude={"rules"})}
+        for p_data in data.programs
+    ]
+    rule_rows = [
+        _rule_values(program_row["id"], r_data)
+        for program_row, p_data in zip(program_rows, data.programs)
+        for r_data in p_data.rules
+    ]
+    if program_rows:
+        await db.execute(insert(LenderProgram), program_rows)
+    if rule_rows:
+        await db.execute(insert(PolicyRule), rule_rows)
     
-    return lender
+    lender_id = lender.id
+    await db.commit()
+    await _invalidate_lender_cache()
+    
+    return await _get_lender(db, lender_id, with_programs=True)
 
 
 @router.put("/{lender_id}", response_model=LenderResponse)
-def update_lender(
+async def update_lender(
     lender_id: UUID,
     data: LenderUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a lender.
     """
-    lender = db.query(Lender).filter(Lender.id == lender_id).first()
+    # Load the tree up front; with expire_on_commit=False it's still valid to return after commit
+    lender = await _get_lender(db, lender_id, with_programs=True)
     
     if not lender:
         raise HTTPException(
@@ -221,48 +298,51 @@ def update_lender(
     for field, value in update_data.items():
         setattr(lender, field, value)
     
-    db.commit()
-    db.refresh(lender)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Lender with name '{data.name}' already exists"
+        )
+    await _invalidate_lender_cache()
     
     return lender
 
 
 @router.delete("/{lender_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_lender(
+async def delete_lender(
     lender_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a lender (cascades to programs, rules, and related match results).
     """
-    from app.models import MatchResult
+    # Single statement; Postgres cascades to programs, rules and match results
+    result = await db.execute(delete(Lender).where(Lender.id == lender_id))
     
-    lender = db.query(Lender).filter(Lender.id == lender_id).first()
-    
-    if not lender:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Lender {lender_id} not found"
         )
     
-    # Delete associated match results first (they reference lender_id)
-    db.query(MatchResult).filter(MatchResult.lender_id == lender_id).delete()
-    
-    db.delete(lender)
-    db.commit()
+    await db.commit()
+    await _invalidate_lender_cache()
 
 
 # ============== Program Endpoints ==============
 
 @router.get("/{lender_id}/programs", response_model=List[LenderProgramResponse])
-def list_programs(
+async def list_programs(
     lender_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all programs for a lender.
     """
-    lender = db.query(Lender).filter(Lender.id == lender_id).first()
+    lender = await _get_lender(db, lender_id, with_programs=True)
     
     if not lender:
         raise HTTPException(
@@ -274,15 +354,15 @@ def list_programs(
 
 
 @router.post("/{lender_id}/programs", response_model=LenderProgramResponse, status_code=status.HTTP_201_CREATED)
-def create_program(
+async def create_program(
     lender_id: UUID,
     data: LenderProgramCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new program for a lender.
     """
-    lender = db.query(Lender).filter(Lender.id == lender_id).first()
+    lender = await _get_lender(db, lender_id)
     
     if not lender:
         raise HTTPException(
@@ -290,54 +370,31 @@ def create_program(
             detail=f"Lender {lender_id} not found"
         )
     
-    program = LenderProgram(
-        lender_id=lender.id,
-        name=data.name,
-        description=data.description,
-        credit_tier=data.credit_tier,
-        min_loan_amount=data.min_loan_amount,
-        max_loan_amount=data.max_loan_amount,
-        max_term_months=data.max_term_months,
-        is_app_only=data.is_app_only,
-        requires_financials=data.requires_financials,
-        priority=data.priority,
-        is_active=data.is_active,
-    )
+    program = LenderProgram(id=uuid4(), lender_id=lender.id, **data.model_dump(exclude={"rules"}))
     db.add(program)
-    db.flush()
-    
-    # Create rules
-    for r_data in data.rules:
-        rule = PolicyRule(
-            program_id=program.id,
-            rule_type=r_data.rule_type,
-            operator=r_data.operator,
-            value=r_data.value if isinstance(r_data.value, dict) else {"value": r_data.value},
-            description=r_data.description,
-            rejection_message=r_data.rejection_message,
-            is_required=r_data.is_required,
-            priority=r_data.priority,
-            weight=r_data.weight,
-            is_active=r_data.is_active,
-        )
-        db.add(rule)
+    await db.flush()
     
-    db.commit()
-    db.refresh(program)
+    # Create rules in one executemany INSERT
+    if data.rules:
+        await db.execute(insert(PolicyRule), [_rule_values(program.id, r_data) for r_data in data.rules])
     
-    return program
+    program_id = program.id
+    await db.commit()
+    await _invalidate_lender_cache()
+    
+    return await _get_program(db, program_id, with_rules=True)
 
 
 @router.put("/programs/{program_id}", response_model=LenderProgramResponse)
-def update_program(
+async def update_program(
     program_id: UUID,
     data: LenderProgramUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a program.
     """
-    program = db.query(LenderProgram).filter(LenderProgram.id == program_id).first()
+    program = await _get_program(db, program_id, with_rules=True)
     
     if not program:
         raise HTTPException(
@@ -349,43 +406,44 @@ def update_program(
     for field, value in update_data.items():
         setattr(program, field, value)
     
-    db.commit()
-    db.refresh(program)
+    await db.commit()
+    await _invalidate_lender_cache()
     
     return program
 
 
 @router.delete("/programs/{program_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_program(
+async def delete_program(
     program_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a program (cascades to rules).
     """
-    program = db.query(LenderProgram).filter(LenderProgram.id == program_id).first()
+    # Single statement; Postgres cascades to rules and unlinks match results
+    result = await db.execute(delete(LenderProgram).where(LenderProgram.id == program_id))
     
-    if not program:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Program {program_id} not found"
         )
     
-    db.delete(program)
-    db.commit()
+    await db.commit()
+    await _invalidate_lender_cache()
 
 
 # ============== Rule Endpoints ==============
 
 @router.get("/programs/{program_id}/rules", response_model=List[PolicyRuleResponse])
-def list_rules(
+async def list_rules(
     program_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     List all rules for a program.
     """
-    program = db.query(LenderProgram).filter(LenderProgram.id == program_id).first()
+    program = await _get_program(db, program_id, with_rules=True)
     
     if not program:
         raise HTTPException(
@@ -397,15 +455,15 @@ def list_rules(
 
 
 @router.post("/programs/{program_id}/rules", response_model=PolicyRuleResponse, status_code=status.HTTP_201_CREATED)
-def create_rule(
+async def create_rule(
     program_id: UUID,
     data: PolicyRuleCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new rule for a program.
     """
-    program = db.query(LenderProgram).filter(LenderProgram.id == program_id).first()
+    program = await _get_program(db, program_id)
     
     if not program:
         raise HTTPException(
@@ -413,35 +471,23 @@ def create_rule(
             detail=f"Program {program_id} not found"
         )
     
-    rule = PolicyRule(
-        program_id=program.id,
-        rule_type=data.rule_type,
-        operator=data.operator,
-        value=data.value if isinstance(data.value, dict) else {"value": data.value},
-        description=data.description,
-        rejection_message=data.rejection_message,
-        is_required=data.is_required,
-        priority=data.priority,
-        weight=data.weight,
-        is_active=data.is_active,
-    )
+    rule = PolicyRule(**_rule_values(program.id, data))
     db.add(rule)
-    db.commit()
-    db.refresh(rule)
+    await db.commit()
     
     return rule
 
 
 @router.put("/rules/{rule_id}", response_model=PolicyRuleResponse)
-def update_rule(
+async def update_rule(
     rule_id: UUID,
     data: PolicyRuleUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a rule.
     """
-    rule = db.query(PolicyRule).filter(PolicyRule.id == rule_id).first()
+    rule = await db.get(PolicyRule, rule_id)
     
     if not rule:
         raise HTTPException(
@@ -451,28 +497,26 @@ def update_rule(
     
     update_data = data.model_dump(exclude_unset=True)
     
-    # Handle value serialization
-    if "value" in update_data and not isinstance(update_data["value"], dict):
-        update_data["value"] = {"value": update_data["value"]}
+    if "value" in update_data:
+        update_data["value"] = _wrap_rule_value(update_data["value"])
     
     for field, value in update_data.items():
         setattr(rule, field, value)
     
-    db.commit()
-    db.refresh(rule)
+    await db.commit()
     
     return rule
 
 
 @router.delete("/rules/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_rule(
+async def delete_rule(
     rule_id: UUID,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a rule.
     """
-    rule = db.query(PolicyRule).filter(PolicyRule.id == rule_id).first()
+    rule = await db.get(PolicyRule, rule_id)
     
     if not rule:
         raise HTTPException(
@@ -480,8 +524,8 @@ def delete_rule(
             detail=f"Rule {rule_id} not found"
         )
     
-    db.delete(rule)
-    db.commit()
+    await db.delete(rule)
+    await db.commit()
 
 
 # Note: /rule-types endpoint moved to top of file to ensure proper route ordering
@@ -1,25 +1,55 @@
 """
 Database connection and session management
 """
+import orjson
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from app.config import get_settings
+from app.config import settings
 
-settings = get_settings()
+# Compiled-statement cache entries per engine (SQLAlchemy default is 500)
+QUERY_CACHE_SIZE = 1200
 
-engine = create_engine(settings.database_url, echo=settings.debug)
+
+def _json_serializer(value) -> str:
+    # JSONB columns (e.g. MatchResult.evaluation_details) are encoded with
+    # orjson rather than the stdlib json module
+    return orjson.dumps(value).decode()
+
+# Sync engine - used for table creation, seeding, and the underwriting workflow
+engine = create_engine(
+    settings.database_url,
+    echo=settings.debug,
+    query_cache_size=QUERY_CACHE_SIZE,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine (asyncpg) - used by the API request handlers
+async_engine = create_async_engine(
+    make_url(settings.database_url).set(drivername="postgresql+asyncpg"),
+    echo=settings.debug,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=True,
+    query_cache_size=QUERY_CACHE_SIZE,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+# expire_on_commit=False: handlers return ORM objects after committing, and a
+# post-commit lazy refresh isn't possible under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
     """Base class for all SQLAlchemy models"""
     pass
 
 
-def get_db():
-    """Dependency for getting database sessions"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency for getting async database sessions"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -5,7 +5,9 @@ from app.engine.evaluators import (
     EvaluationContext,
     EvaluationResult,
     RuleEvaluator,
+    evaluate_rules,
     get_evaluator,
+    get_rule_types,
     register_evaluator,
     EVALUATOR_REGISTRY,
 )
@@ -16,7 +18,9 @@ __all__ = [
     "EvaluationContext",
     "EvaluationResult", 
     "RuleEvaluator",
+    "evaluate_rules",
     "get_evaluator",
+    "get_rule_types",
     "register_evaluator",
     "EVALUATOR_REGISTRY",
     "LenderMatcher",
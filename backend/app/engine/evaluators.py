@@ -4,17 +4,29 @@ Rule Evaluators - Extensible system for evaluating policy rules
 Each evaluator handles a specific rule type and returns a standardized result.
 New rule types can be added by creating a new evaluator class and registering it.
 """
+import logging
+import re
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
 from decimal import Decimal
-from typing import Any, Dict, Optional, TYPE_CHECKING
+from functools import lru_cache
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.models import PolicyRule
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Unknown rule types already warned about; each is logged once per process
+_warned_rule_types: Set[str] = set()
+
+
+TRUCKING_KEYWORDS = ["truck", "trailer", "reefer", "class 8", "semi", "tractor", "otr"]
+_TRUCKING_RE = re.compile("|".join(map(re.escape, TRUCKING_KEYWORDS)))
+
+
+@dataclass(frozen=True, slots=True)
 class EvaluationContext:
     """Context containing all application data needed for evaluation"""
     # Borrower data
@@ -56,24 +68,40 @@ class EvaluationContext:
     paynet_score: Optional[int]
     comparable_credit_pct: Optional[Decimal]
     
+    # Date that ages are measured at (defaults to today; fixed in tests)
+    reference_date: Optional[date] = None
+    
+    # Derived values the evaluators compare against, built once per
+    # application (the context is frozen, so they can't go stale)
+    state_upper: str = field(init=False, repr=False)
+    industry_lower: str = field(init=False, repr=False)
+    equipment_type_lower: str = field(init=False, repr=False)
+    bankruptcy_years: Optional[int] = field(init=False, repr=False)
+    
+    def __post_init__(self):
+        object.__setattr__(self, "state_upper", self.state.upper())
+        object.__setattr__(self, "industry_lower", self.industry.lower())
+        object.__setattr__(self, "equipment_type_lower", self.equipment_type.lower())
+        
+        bankruptcy_years = None
+        if self.guarantor_bankruptcy_discharge_date:
+            today = self.reference_date or date.today()
+            bankruptcy_years = (today - self.guarantor_bankruptcy_discharge_date).days // 365
+        object.__setattr__(self, "bankruptcy_years", bankruptcy_years)
+    
     @property
     def is_trucking(self) -> bool:
         """Check if this is a trucking-related application"""
-        trucking_keywords = ["truck", "trailer", "reefer", "class 8", "semi", "tractor", "otr"]
-        equip_lower = self.equipment_type.lower()
-        industry_lower = self.industry.lower()
-        return any(kw in equip_lower or kw in industry_lower for kw in trucking_keywords)
+        # NUL-joined so a keyword can't match across the two strings
+        return _TRUCKING_RE.search(f"{self.equipment_type_lower}\0{self.industry_lower}") is not None
     
     @property
     def years_since_bankruptcy(self) -> Optional[int]:
-        """Calculate years since bankruptcy discharge"""
-        if self.guarantor_bankruptcy_discharge_date:
-            today = date.today()
-            return (today - self.guarantor_bankruptcy_discharge_date).days // 365
-        return None
+        """Years since bankruptcy discharge, as of reference_date"""
+        return self.bankruptcy_years
 
 
-@dataclass
+@dataclass(slots=True)
 class EvaluationResult:
     """Result of evaluating a single rule"""
     passed: bool
@@ -98,6 +126,38 @@ class EvaluationResult:
         }
 
 
+@lru_cache(maxsize=4096, typed=True)
+def _to_decimal(raw: Any) -> Decimal:
+    """Decimal for a rule's JSON number; rule values repeat, so parse each once"""
+    return Decimal(str(raw))
+
+
+@lru_cache(maxsize=1024)
+def _upper_set(values: Tuple[str, ...]) -> FrozenSet[str]:
+    """
+    Uppercased lookup set for a rule's list of codes. Keyed by the list's
+    contents rather than the rule id, so an edited rule never hits a stale set.
+    """
+    return frozenset(v.upper() for v in values)
+
+
+@lru_cache(maxsize=1024)
+def _partial_matcher(values: Tuple[str, ...]) -> Callable[[str], bool]:
+    """
+    Case-insensitive partial matcher for a rule's exclusion list: the returned
+    function takes a lowercased string and is True when it contains, or is
+    contained in, any exclusion. Both directions are one C-level scan: a
+    compiled alternation of the exclusions, and a substring test against
+    all of them joined by NUL.
+    """
+    if not values:
+        return lambda actual: False
+    lowered = [v.lower() for v in values]
+    contains_exclusion = re.compile("|".join(map(re.escape, lowered))).search
+    exclusions = "\0".join(lowered)
+    return lambda actual: contains_exclusion(actual) is not None or actual in exclusions
+
+
 class RuleEvaluator(ABC):
     """Base class for all rule evaluators"""
     
@@ -216,7 +276,7 @@ class AmountMinEvaluator(RuleEvaluator):
     """Evaluate minimum loan amount"""
     
     def evaluate(self, ctx: EvaluationContext, rule: "PolicyRule") -> EvaluationResult:
-        required = Decimal(str(self._get_value(rule)))
+        required = _to_decimal(self._get_value(rule))
         actual = ctx.amount_requested
         passed = actual >= required
         
@@ -236,7 +296,7 @@ class AmountMaxEvaluator(RuleEvaluator):
     """Evaluate maximum loan amount"""
     
     def evaluate(self, ctx: EvaluationContext, rule: "PolicyRule") -> EvaluationResult:
-        required = Decimal(str(self._get_value(rule)))
+        required = _to_decimal(self._get_value(rule))
         actual = ctx.amount_requested
         passed = actual <= required
         
@@ -333,8 +393,8 @@ class ExcludedStatesEvaluator(RuleEvaluator):
         excluded = self._get_value(rule)
         if isinstance(excluded, str):
             excluded = [excluded]
-        actual = ctx.state.upper()
-        passed = actual not in [s.upper() for s in excluded]
+        actual = ctx.state_upper
+        passed = actual not in _upper_set(tuple(excluded))
         
         return EvaluationResult(
             passed=passed,
@@ -355,10 +415,10 @@ class ExcludedIndustriesEvaluator(RuleEvaluator):
         excluded = self._get_value(rule)
         if isinstance(excluded, str):
             excluded = [excluded]
-        actual = ctx.industry.lower()
+        actual = ctx.industry_lower
         
         # Check if industry matches any exclusion (partial match)
-        is_excluded = any(excl.lower() in actual or actual in excl.lower() for excl in excluded)
+        is_excluded = _partial_matcher(tuple(excluded))(actual)
         passed = not is_excluded
         
         return EvaluationResult(
@@ -380,10 +440,10 @@ class ExcludedEquipmentEvaluator(RuleEvaluator):
         excluded = self._get_value(rule)
         if isinstance(excluded, str):
             excluded = [excluded]
-        actual = ctx.equipment_type.lower()
+        actual = ctx.equipment_type_lower
         
         # Check if equipment matches any exclusion (partial match)
-        is_excluded = any(excl.lower() in actual or actual in excl.lower() for excl in excluded)
+        is_excluded = _partial_matcher(tuple(excluded))(actual)
         passed = not is_excluded
         
         return EvaluationResult(
@@ -603,7 +663,7 @@ class ComparableCreditPctEvaluator(RuleEvaluator):
     """Evaluate comparable credit percentage requirement"""
     
     def evaluate(self, ctx: EvaluationContext, rule: "PolicyRule") -> EvaluationResult:
-        required = Decimal(str(self._get_value(rule)))
+        required = _to_decimal(self._get_value(rule))
         actual = ctx.comparable_credit_pct
         
         if actual is None:
@@ -635,7 +695,7 @@ class RevolvingAvailableMinEvaluator(RuleEvaluator):
     """Evaluate minimum revolving credit available percentage"""
     
     def evaluate(self, ctx: EvaluationContext, rule: "PolicyRule") -> EvaluationResult:
-        required = Decimal(str(self._get_value(rule)))
+        required = _to_decimal(self._get_value(rule))
         actual = ctx.guarantor_revolving_available_pct
         
         if actual is None:
@@ -788,6 +848,76 @@ def get_evaluator(rule_type: str) -> Optional[RuleEvaluator]:
     return EVALUATOR_REGISTRY.get(rule_type)
 
 
+SKIPPED_REASON = "Not evaluated: a prior required rule failed"
+
+
+def _skipped_result(rule: "PolicyRule") -> EvaluationResult:
+    return EvaluationResult(
+        passed=False,
+        rule_type=rule.rule_type,
+        rule_id=str(rule.id),
+        required_value=None,
+        actual_value=None,
+        is_required=rule.is_required,
+        weight=rule.weight,
+        reason=SKIPPED_REASON,
+    )
+
+
+def evaluate_rules(
+    ctx: EvaluationContext,
+    rules: Sequence["PolicyRule"],
+    stop_on_required_fail: bool = False,
+) -> List[EvaluationResult]:
+    """
+    Evaluate rules, returning results in rule order. Rules without a
+    registered evaluator are skipped.
+    
+    With stop_on_required_fail, required rules are evaluated first and the
+    first failure ends evaluation: the remaining rules get a cheap failed
+    "not evaluated" result. Only use it when the
+    caller needs eligibility, not the full breakdown or fit score.
+    """
+    # Resolve every evaluator up front, with the registry lookup bound locally
+    registry_get = EVALUATOR_REGISTRY.get
+    evaluators = [registry_get(rule.rule_type) for rule in rules]
+    for rule, evaluator in zip(rules, evaluators):
+        if evaluator is None:
+            # Unknown rule type - log warning but don't fail
+            if rule.rule_type not in _warned_rule_types:
+                _warned_rule_types.add(rule.rule_type)
+                logger.warning("No evaluator for rule type '%s'; skipping it", rule.rule_type)
+    
+    if not stop_on_required_fail:
+        return [
+            evaluator.evaluate(ctx, rule)
+            for rule, evaluator in zip(rules, evaluators)
+            if evaluator is not None
+        ]
+    
+    # Required rules first (stable, so priority order holds within each group);
+    # results still come back in the given rule order
+    order = sorted(
+        (i for i, evaluator in enumerate(evaluators) if evaluator is not None),
+        key=lambda i: not rules[i].is_required,
+    )
+    results: List[Optional[EvaluationResult]] = [None] * len(rules)
+    for n, i in enumerate(order):
+        result = results[i] = evaluators[i].evaluate(ctx, rules[i])
+        if result.is_required and not result.passed:
+            for j in order[n + 1:]:
+                results[j] = _skipped_result(rules[j])
+            break
+    return [r for r in results if r is not None]
+
+
+@lru_cache(maxsize=None)
+def get_rule_types() -> Tuple[str, ...]:
+    """All registered rule types (memoized until the registry changes)"""
+    return tuple(EVALUATOR_REGISTRY.keys())
+
+
 def register_evaluator(rule_type: str, evaluator: RuleEvaluator) -> None:
     """Register a new evaluator (for extensibility)"""
     EVALUATOR_REGISTRY[rule_type] = evaluator
+    get_rule_types.cache_clear()
@@ -3,7 +3,7 @@ Lender Matcher - Core matching engine that evaluates applications against lender
 """
 from typing import List, Optional, Tuple
 from dataclasses import dataclass
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.models import (
     Borrower, Guarantor, LoanApplication, 
@@ -11,9 +11,9 @@ from app.models import (
 )
 from app.engine.evaluators import (
     EvaluationContext, EvaluationResult, 
-    get_evaluator, EVALUATOR_REGISTRY
+    evaluate_rules, get_rule_types
 )
-from app.engine.scoring import calculate_fit_score, calculate_program_priority_score
+from app.engine.scoring import calculate_program_priority_score, fit_score_from_weights
 
 
 @dataclass
@@ -54,12 +54,11 @@ class LenderMatcher:
         borrower = application.borrower
         
         # Get primary guarantor (highest ownership %)
-        guarantors = sorted(
-            borrower.guarantors, 
-            key=lambda g: g.ownership_percentage, 
-            reverse=True
+        primary_guarantor = max(
+            borrower.guarantors,
+            key=lambda g: g.ownership_percentage,
+            default=None,
         )
-        primary_guarantor = guarantors[0] if guarantors else None
         
         return EvaluationContext(
             # Borrower
@@ -105,44 +104,43 @@ class LenderMatcher:
     def evaluate_program(
         self, 
         ctx: EvaluationContext, 
-        program: LenderProgram
+        program: LenderProgram,
+        stop_on_required_fail: bool = False,
     ) -> ProgramEvaluation:
-        """Evaluate an application against a single program's rules"""
-        results: List[EvaluationResult] = []
+        """
+        Evaluate an application against a single program's rules.
         
-        # Get active rules sorted by priority
-        rules = sorted(
-            [r for r in program.rules if r.is_active],
-            key=lambda r: r.priority
-        )
+        With stop_on_required_fail, evaluation ends at the first failed required
+        rule, so the results and fit score of an ineligible program are incomplete.
+        """
+        # Active rules; the relationship already loads them in priority order
+        rules = [r for r in program.rules if r.is_active]
         
-        for rule in rules:
-            evaluator = get_evaluator(rule.rule_type)
-            if evaluator:
-                result = evaluator.evaluate(ctx, rule)
-                results.append(result)
-            else:
-                # Unknown rule type - log warning but don't fail
-                print(f"Warning: No evaluator for rule type '{rule.rule_type}'")
+        results = evaluate_rules(ctx, rules, stop_on_required_fail)
         
         # Calculate eligibility and score
-        required_failed = any(
-            not r.passed and r.is_required 
-            for r in results
-        )
+        passed_count = 0
+        total_weight = 0
+        passed_weight = 0
+        required_failed = False
+        for r in results:
+            total_weight += r.weight
+            if r.passed:
+                passed_count += 1
+                passed_weight += r.weight
+            elif r.is_required:
+                required_failed = True
         is_eligible = not required_failed
-        fit_score = calculate_fit_score(results)
-        
-        passed = [r for r in results if r.passed]
-        failed = [r for r in results if not r.passed]
+        # Same score as calculate_fit_score(results), from the totals above
+        fit_score = fit_score_from_weights(total_weight, passed_weight, not required_failed) if results else 0
         
         return ProgramEvaluation(
             program=program,
             is_eligible=is_eligible,
             fit_score=fit_score,
             results=results,
-            passed_count=len(passed),
-            failed_count=len(failed),
+            passed_count=passed_count,
+            failed_count=len(results) - passed_count,
         )
     
     def evaluate_lender(
@@ -153,15 +151,16 @@ class LenderMatcher:
         """Evaluate an application against all of a lender's programs"""
         program_evaluations: List[ProgramEvaluation] = []
         
-        # Get active programs sorted by priority
-        programs = sorted(
-            [p for p in lender.programs if p.is_active],
-            key=lambda p: p.priority
-        )
+        # Active programs; the relationship already loads them in priority order
+        programs = [p for p in lender.programs if p.is_active]
         
+        has_eligible = False
         for program in programs:
-            eval_result = self.evaluate_program(ctx, program)
+            # Once a program qualifies, ineligible programs can never be picked
+            # as best, so the rest only need evaluating until a required rule fails
+            eval_result = self.evaluate_program(ctx, program, stop_on_required_fail=has_eligible)
             program_evaluations.append(eval_result)
+            has_eligible = has_eligible or eval_result.is_eligible
         
         # Find best program (eligible first, then by fit score)
         eligible_programs = [p for p in program_evaluations if p.is_eligible]
@@ -193,8 +192,17 @@ class LenderMatcher:
         # Build context
         ctx = self.build_context(application)
         
-        # Get all active lenders
-        lenders = self.db.query(Lender).filter(Lender.is_active == True).all()
+        # Get all active lenders with their active programs and rules; inactive
+        # ones are never evaluated, so leave them in the database
+        lenders = (
+            self.db.query(Lender)
+            .filter(Lender.is_active == True)
+            .options(
+                selectinload(Lender.programs.and_(LenderProgram.is_active == True))
+                .selectinload(LenderProgram.rules.and_(PolicyRule.is_active == True))
+            )
+            .all()
+        )
         
         results: List[MatchResult] = []
         
@@ -205,15 +213,21 @@ class LenderMatcher:
             best_program = lender_eval.best_program
             
             if best_program:
-                passed_details = [r.to_dict() for r in best_program.results if r.passed]
-                failed_details = [r.to_dict() for r in best_program.results if not r.passed]
+                # Serialize each result once; the summary lists share the dicts
+                details = []
+                passed_details = []
+                failed_details = []
+                for r in best_program.results:
+                    detail = r.to_dict()
+                    details.append(detail)
+                    (passed_details if r.passed else failed_details).append(detail)
                 
                 evaluation_details = {
                     "rules_evaluated": len(best_program.results),
                     "rules_passed": best_program.passed_count,
                     "rules_failed": best_program.failed_count,
                     "pass_rate": best_program.passed_count / len(best_program.results) if best_program.results else 0,
-                    "details": [r.to_dict() for r in best_program.results],
+                    "details": details,
                     "summary": {
                         "passed": passed_details,
                         "failed": failed_details,
@@ -237,8 +251,8 @@ class LenderMatcher:
             # Create MatchResult
             match_result = MatchResult(
                 application_id=application.id,
-                lender_id=lender.id,
-                program_id=best_program.program.id if best_program else None,
+                lender=lender,
+                program=best_program.program if best_program else None,
                 is_eligible=lender_eval.is_eligible,
                 fit_score=lender_eval.fit_score,
                 evaluation_details=evaluation_details,
@@ -256,4 +270,4 @@ class LenderMatcher:
     
     def get_supported_rule_types(self) -> List[str]:
         """Return list of all supported rule types"""
-        return list(EVALUATOR_REGISTRY.keys())
+        return list(get_rule_types())
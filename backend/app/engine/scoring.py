@@ -23,24 +23,37 @@ def calculate_fit_score(results: List[EvaluationResult]) -> int:
     if not results:
         return 0
     
-    total_weight = sum(r.weight for r in results)
-    passed_weight = sum(r.weight for r in results if r.passed)
-    
-    # Required rules
-    required_results = [r for r in results if r.is_required]
-    required_passed = all(r.passed for r in required_results)
+    # One pass over the results
+    total_weight = 0
+    passed_weight = 0
+    required_passed = True
+    for r in results:
+        total_weight += r.weight
+        if r.passed:
+            passed_weight += r.weight
+        elif r.is_required:
+            required_passed = False
     
+    return fit_score_from_weights(total_weight, passed_weight, required_passed)
+
+
+def fit_score_from_weights(total_weight: int, passed_weight: int, required_passed: bool) -> int:
+    """
+    Fit score from totals already accumulated over a non-empty result list,
+    for callers that walk the results anyway (see calculate_fit_score).
+    """
     if total_weight == 0:
         return 100 if required_passed else 50
     
+    pass_rate = passed_weight / total_weight
+    
     # Base score (70 max)
-    base_score = (passed_weight / total_weight) * 70
+    base_score = pass_rate * 70
     
     # Bonus for all required rules passing (+15)
     required_bonus = 15 if required_passed else 0
     
     # Bonus for high pass rate (+15)
-    pass_rate = passed_weight / total_weight
     high_pass_bonus = 15 if pass_rate >= 0.9 else 0
     
     total_score = base_score + required_bonus + high_pass_bonus
@@ -1,14 +1,20 @@
 """
 Lender Matching Platform - FastAPI Application Entry Point
 """
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import get_settings
+from app.config import settings
 from app.database import engine, Base
 from app.api import applications_router, lenders_router
 
-settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Surface missing optional secrets at boot rather than on the first request
+if not settings.gemini_api_key:
+    logger.warning("GEMINI_API_KEY is not set; /api/lenders/parse-pdf will return 503")
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -39,6 +45,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "X-RateLimit-Reset",
+        "Retry-After",
+    ],
 )
 
 # Include routers
@@ -40,7 +40,7 @@ class Borrower(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    guarantors: Mapped[list["Guarantor"]] = relationship("Guarantor", back_populates="borrower", cascade="all, delete-orphan")
+    guarantors: Mapped[list["Guarantor"]] = relationship("Guarantor", back_populates="borrower", cascade="all, delete-orphan", lazy="raise_on_sql")
     loan_applications: Mapped[list["LoanApplication"]] = relationship("LoanApplication", back_populates="borrower", cascade="all, delete-orphan")
     
     def __repr__(self):
@@ -57,7 +57,7 @@ class Guarantor(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    borrower: Mapped["Borrower"] = relationship("Borrower", back_populates="guarantors")
+    borrower: Mapped["Borrower"] = relationship("Borrower", back_populates="guarantors", lazy="raise_on_sql")
     
     @property
     def full_name(self) -> str:
@@ -4,7 +4,7 @@ Lender and Policy models - core of the extensible policy system
 import uuid
 from datetime import datetime
 from enum import Enum as PyEnum
-from sqlalchemy import String, Integer, Boolean, DateTime, Text, ForeignKey, Enum
+from sqlalchemy import String, Integer, Boolean, DateTime, Text, ForeignKey, Enum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
@@ -60,20 +60,27 @@ class Lender(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationships
-    programs: Mapped[list["LenderProgram"]] = relationship("LenderProgram", back_populates="lender", cascade="all, delete-orphan")
-    match_results: Mapped[list["MatchResult"]] = relationship("MatchResult", back_populates="lender")
+    # Relationships raise instead of lazy-loading, so every query states its eager loads.
+    # Deletes cascade in the database (ON DELETE on the child FKs), so the ORM never
+    # needs to load children just to delete them. Programs and rules load in
+    # priority order (the matcher's evaluation order).
+    programs: Mapped[list["LenderProgram"]] = relationship("LenderProgram", back_populates="lender", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql", order_by="[LenderProgram.priority, LenderProgram.id]")
+    match_results: Mapped[list["MatchResult"]] = relationship("MatchResult", back_populates="lender", passive_deletes=True, lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<Lender {self.name}>"
 
 
+# Serves list_lenders(active_only=True), which orders by name
+Index("ix_lender_active_name", Lender.is_active, Lender.name)
+
+
 class LenderProgram(Base):
     """A specific program/tier offered by a lender (e.g., Tier 1, Medical, A Credit)"""
     __tablename__ = "lender_programs"
     
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    lender_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lenders.id"), nullable=False)
+    lender_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lenders.id", ondelete="CASCADE"), nullable=False)
     
     # Program Details
     name: Mapped[str] = mapped_column(String(100), nullable=False)  # "Tier 1", "Standard", "Medical"
@@ -100,12 +107,17 @@ class LenderProgram(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    lender: Mapped["Lender"] = relationship("Lender", back_populates="programs")
-    rules: Mapped[list["PolicyRule"]] = relationship("PolicyRule", back_populates="program", cascade="all, delete-orphan")
-    match_results: Mapped[list["MatchResult"]] = relationship("MatchResult", back_populates="program")
+    lender: Mapped["Lender"] = relationship("Lender", back_populates="programs", lazy="raise_on_sql")
+    rules: Mapped[list["PolicyRule"]] = relationship("PolicyRule", back_populates="program", cascade="all, delete-orphan", passive_deletes=True, lazy="raise_on_sql", order_by="[PolicyRule.priority, PolicyRule.id]")
+    match_results: Mapped[list["MatchResult"]] = relationship("MatchResult", back_populates="program", passive_deletes=True, lazy="raise_on_sql")
     
     def __repr__(self):
-        return f"<LenderProgram {self.lender.name if self.lender else 'Unknown'} - {self.name}>"
+        # lender_id, not lender.name: the relationship raises rather than lazy-loading
+        return f"<LenderProgram {self.name} (lender {self.lender_id})>"
+
+
+# Serves the eager load of Lender.programs, which orders by priority
+Index("ix_program_lender_priority", LenderProgram.lender_id, LenderProgram.priority)
 
 
 class PolicyRule(Base):
@@ -116,7 +128,7 @@ class PolicyRule(Base):
     __tablename__ = "policy_rules"
     
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    program_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lender_programs.id"), nullable=False)
+    program_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lender_programs.id", ondelete="CASCADE"), nullable=False)
     
     # Rule Definition
     rule_type: Mapped[str] = mapped_column(String(50), nullable=False)  # "fico_min", "excluded_states", etc.
@@ -140,12 +152,16 @@ class PolicyRule(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    program: Mapped["LenderProgram"] = relationship("LenderProgram", back_populates="rules")
+    program: Mapped["LenderProgram"] = relationship("LenderProgram", back_populates="rules", lazy="raise_on_sql")
     
     def __repr__(self):
         return f"<PolicyRule {self.rule_type} {self.operator.value} {self.value}>"
 
 
+# Serves the eager load of LenderProgram.rules, which orders by priority
+Index("ix_rule_program_priority", PolicyRule.program_id, PolicyRule.priority)
+
+
 # Supported rule_types documentation:
 # --------------------------------
 # CREDIT SCORES
@@ -5,7 +5,7 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum as PyEnum
-from sqlalchemy import String, Integer, Numeric, Boolean, DateTime, Enum, ForeignKey
+from sqlalchemy import String, Integer, Numeric, Boolean, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -59,6 +59,8 @@ class LoanApplication(Base):
         Enum(ApplicationStatus), 
         default=ApplicationStatus.DRAFT
     )
+    # Why the last underwriting run failed; cleared when a run is queued or succeeds
+    underwriting_error: Mapped[str | None] = mapped_column(String(500), nullable=True)
     
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -67,7 +69,7 @@ class LoanApplication(Base):
     underwriting_completed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
     
     # Relationships
-    borrower: Mapped["Borrower"] = relationship("Borrower", back_populates="loan_applications")
+    borrower: Mapped["Borrower"] = relationship("Borrower", back_populates="loan_applications", lazy="raise_on_sql")
     match_results: Mapped[list["MatchResult"]] = relationship("MatchResult", back_populates="application", cascade="all, delete-orphan")
     
     @property
@@ -79,3 +81,7 @@ class LoanApplication(Base):
     
     def __repr__(self):
         return f"<LoanApplication ${self.amount_requested:,.2f} - {self.equipment_type}>"
+
+
+# Serves list_applications: filter by status, newest first
+Index("ix_app_status_created", LoanApplication.status, LoanApplication.created_at.desc())
@@ -3,7 +3,7 @@ Match Result model - stores underwriting results for each lender
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import Integer, Boolean, DateTime, ForeignKey
+from sqlalchemy import Integer, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
@@ -21,8 +21,8 @@ class MatchResult(Base):
     
     # References
     application_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("loan_applications.id"), nullable=False)
-    lender_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lenders.id"), nullable=False)
-    program_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("lender_programs.id"), nullable=True)
+    lender_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lenders.id", ondelete="CASCADE"), nullable=False)
+    program_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("lender_programs.id", ondelete="SET NULL"), nullable=True)
     
     # Match Result
     is_eligible: Mapped[bool] = mapped_column(Boolean, nullable=False)
@@ -68,10 +68,15 @@ class MatchResult(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     
     # Relationships
-    application: Mapped["LoanApplication"] = relationship("LoanApplication", back_populates="match_results")
-    lender: Mapped["Lender"] = relationship("Lender", back_populates="match_results")
-    program: Mapped["LenderProgram | None"] = relationship("LenderProgram", back_populates="match_results")
+    application: Mapped["LoanApplication"] = relationship("LoanApplication", back_populates="match_results", lazy="raise_on_sql")
+    lender: Mapped["Lender"] = relationship("Lender", back_populates="match_results", lazy="raise_on_sql")
+    program: Mapped["LenderProgram | None"] = relationship("LenderProgram", back_populates="match_results", lazy="raise_on_sql")
     
     def __repr__(self):
         status = "Eligible" if self.is_eligible else "Not Eligible"
-        return f"<MatchResult {self.lender.name if self.lender else 'Unknown'} - {status} ({self.fit_score})>"
+        # lender_id, not lender.name: the relationship raises rather than lazy-loading
+        return f"<MatchResult lender {self.lender_id} - {status} ({self.fit_score})>"
+
+
+# Serves get_results: one application's matches, eligible first, best fit first
+Index("ix_match_app_elig_fit", MatchResult.application_id, MatchResult.is_eligible.desc(), MatchResult.fit_score.desc())
@@ -321,6 +321,7 @@ class UnderwritingResultsResponse(BaseModel):
     ineligible_count: int
     best_match: Optional[MatchResultResponse] = None
     results: List[MatchResultResponse] = []
+    error: Optional[str] = None  # why the last run failed, if it did
 
 
 # ============== Underwriting Request ==============
@@ -0,0 +1,113 @@
+"""
+Listing Cache Service - Short-lived cache for read-heavy, rarely-changing listings
+
+Uses Redis when REDIS_URL is configured, so every API worker shares the same
+entries and sees the same invalidations. Without Redis it falls back to a small
+in-process TTL cache (per worker, so entries should be kept short-lived).
+"""
+import logging
+from typing import Any, Optional
+
+import orjson
+from cachetools import TTLCache
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client():
+    """Redis client for REDIS_URL, or None when Redis isn't configured"""
+    if not settings.redis_url:
+        return None
+    # Optional dependency - only needed when Redis is configured
+    from redis import asyncio as aioredis
+    return aioredis.from_url(settings.redis_url)
+
+
+def _json_default(obj: Any) -> Any:
+    # Pydantic DTOs and driver-specific types (e.g. asyncpg's UUID)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    return str(obj)
+
+
+class ListingCache:
+    """
+    Namespaced get/set/clear cache for JSON-serializable listings.
+
+    Entries are stored under the cache's current generation, which clear()
+    bumps. Read the generation before querying and pass it to get/set: a
+    listing built while a clear() ran is then never stored, and anything
+    stored under an old generation is unreachable.
+
+    Usage:
+        cache = ListingCache("lenders", ttl=30, local_ttl=5)
+        generation = await cache.generation()
+        hit = await cache.get(key, generation)
+        await cache.set(key, value, generation)
+        await cache.clear()  # after any write that changes the listing
+    """
+
+    def __init__(self, namespace: str, ttl: int, local_ttl: int, maxsize: int = 256):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local: TTLCache = TTLCache(maxsize=maxsize, ttl=local_ttl)
+        self.local_generation = 0
+        self.redis = get_redis_client()
+
+    def _redis_key(self, key: Any, generation: int) -> str:
+        return f"kaaj:{self.namespace}:{generation}:{key}"
+
+    @property
+    def _generation_key(self) -> str:
+        return f"kaaj:{self.namespace}:generation"
+
+    async def generation(self) -> Optional[int]:
+        """Current generation, or None when it can't be read (treat as uncacheable)"""
+        if self.redis is None:
+            return self.local_generation
+        try:
+            raw = await self.redis.get(self._generation_key)
+        except Exception as e:
+            logger.warning("Redis get failed for %s: %s", self._generation_key, e)
+            return None
+        return int(raw) if raw is not None else 0
+
+    async def get(self, key: Any, generation: Optional[int]) -> Optional[Any]:
+        if generation is None:
+            return None
+        if self.redis is None:
+            return self.local.get((generation, key))
+        try:
+            raw = await self.redis.get(self._redis_key(key, generation))
+        except Exception as e:
+            # A cache outage shouldn't take the endpoint down with it
+            logger.warning("Redis get failed for %s: %s", self._redis_key(key, generation), e)
+            return None
+        return orjson.loads(raw) if raw is not None else None
+
+    async def set(self, key: Any, value: Any, generation: Optional[int]) -> None:
+        # Skip values built from data that a clear() has since invalidated
+        if generation is None or generation != await self.generation():
+            return
+        if self.redis is None:
+            self.local[(generation, key)] = value
+            return
+        try:
+            await self.redis.set(
+                self._redis_key(key, generation), orjson.dumps(value, default=_json_default), ex=self.ttl
+            )
+        except Exception as e:
+            logger.warning("Redis set failed for %s: %s", self._redis_key(key, generation), e)
+
+    async def clear(self) -> None:
+        self.local_generation += 1
+        self.local.clear()
+        if self.redis is None:
+            return
+        try:
+            # Old-generation entries become unreachable and expire on their own
+            await self.redis.incr(self._generation_key)
+        except Exception as e:
+            logger.warning("Redis invalidation failed for %s: %s", self.namespace, e)
@@ -2,23 +2,32 @@
 PDF Parser Service - Extract text from lender guideline PDFs
 """
 import io
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 import pdfplumber
 
+# Raw bytes, a path, or a seekable binary file (e.g. an upload's spooled temp file)
+PdfSource = Union[bytes, str, BinaryIO]
 
-def extract_text_from_pdf(pdf_bytes: bytes) -> str:
+
+def _open_pdf(source: PdfSource):
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return pdfplumber.open(source)
+
+
+def extract_text_from_pdf(source: PdfSource) -> str:
     """
     Extract all text content from a PDF file.
     
     Args:
-        pdf_bytes: Raw PDF file bytes
+        source: Raw PDF bytes, a file path, or a seekable binary file
         
     Returns:
         Extracted text as a single string
     """
     text_parts = []
     
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    with _open_pdf(source) as pdf:
         for page in pdf.pages:
             page_text = page.extract_text()
             if page_text:
@@ -27,19 +36,19 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
     return "\n\n".join(text_parts)
 
 
-def extract_tables_from_pdf(pdf_bytes: bytes) -> list[list[list[str]]]:
+def extract_tables_from_pdf(source: PdfSource) -> list[list[list[str]]]:
     """
     Extract tables from a PDF file.
     
     Args:
-        pdf_bytes: Raw PDF file bytes
+        source: Raw PDF bytes, a file path, or a seekable binary file
         
     Returns:
         List of tables, where each table is a list of rows
     """
     tables = []
     
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    with _open_pdf(source) as pdf:
         for page in pdf.pages:
             page_tables = page.extract_tables()
             if page_tables:
@@ -48,23 +57,36 @@ def extract_tables_from_pdf(pdf_bytes: bytes) -> list[list[list[str]]]:
     return tables
 
 
-def parse_pdf(pdf_bytes: bytes) -> dict:
+def parse_pdf(source: PdfSource, include_tables: bool = True) -> dict:
     """
     Parse a PDF and return structured content.
     
     Args:
-        pdf_bytes: Raw PDF file bytes
+        source: Raw PDF bytes, a file path, or a seekable binary file
+        include_tables: Also extract tables; callers that only need the text
+            can skip this (tables then comes back empty)
         
     Returns:
         Dict with text content and metadata
     """
-    text = extract_text_from_pdf(pdf_bytes)
-    tables = extract_tables_from_pdf(pdf_bytes)
+    text_parts = []
+    tables = []
     
-    # Get page count
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    # One open and one pass: text and table extraction share each page's
+    # parsed layout objects, which pdfplumber caches per page
+    with _open_pdf(source) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+            if include_tables:
+                page_tables = page.extract_tables()
+                if page_tables:
+                    tables.extend(page_tables)
         page_count = len(pdf.pages)
     
+    text = "\n\n".join(text_parts)
+    
     return {
         "text": text,
         "tables": tables,
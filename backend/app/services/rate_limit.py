@@ -0,0 +1,116 @@
+"""
+Rate Limiter Service - Sliding-window request limits for expensive endpoints
+
+Uses Redis when REDIS_URL is configured, so the limit holds across all API
+workers. Without Redis each worker keeps its own window in memory (the
+effective limit is then per worker).
+
+Clients are identified by request.client.host. Behind a reverse proxy or load
+balancer that is the proxy's address, so uvicorn must run with --proxy-headers
+and --forwarded-allow-ips (or FORWARDED_ALLOW_IPS) set to the proxy's IPs;
+otherwise every client shares one bucket.
+"""
+import logging
+import secrets
+import time
+from collections import deque
+from typing import Tuple
+from uuid import uuid4
+
+from cachetools import TTLCache
+from fastapi import HTTPException, Request, Response, status
+
+from app.config import settings
+from app.services.cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    FastAPI dependency allowing `times` requests per client IP in any
+    `seconds`-long window. Rejected requests get a 429 (with Retry-After)
+    before the endpoint body runs; 429s and successful responses carry
+    X-RateLimit-* headers.
+
+    Usage:
+        pdf_rate_limit = RateLimiter("parse-pdf", times=5, seconds=60)
+
+        @router.post("/parse-pdf", dependencies=[Depends(pdf_rate_limit)])
+    """
+
+    def __init__(self, name: str, times: int, seconds: int, maxsize: int = 10_000):
+        self.name = name
+        self.times = times
+        self.seconds = seconds
+        # Request timestamps per client; idle clients age out with the window
+        self.local: TTLCache = TTLCache(maxsize=maxsize, ttl=seconds)
+        self.redis = get_redis_client()
+
+    def _redis_key(self, client: str) -> str:
+        return f"kaaj:ratelimit:{self.name}:{client}"
+
+    def _hit_local(self, client: str, now: float) -> Tuple[bool, int, float]:
+        hits = self.local.get(client)
+        if hits is None:
+            hits = deque()
+        while hits and hits[0] <= now - self.seconds:
+            hits.popleft()
+        allowed = len(hits) < self.times
+        if allowed:
+            hits.append(now)
+        # Re-set so the entry's TTL restarts from this request
+        self.local[client] = hits
+        return allowed, len(hits), hits[0] if hits else now
+
+    async def _hit_redis(self, client: str, now: float) -> Tuple[bool, int, float]:
+        key = self._redis_key(client)
+        member = f"{now}:{uuid4().hex}"
+        # Record the hit and count in one MULTI, so concurrent requests can't
+        # all pass the check before any of them is added to the window
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, 0, now - self.seconds)
+            pipe.zadd(key, {member: now})
+            pipe.zcard(key)
+            pipe.zrange(key, 0, 0, withscores=True)
+            pipe.expire(key, self.seconds)
+            _, _, count, oldest, _ = await pipe.execute()
+        allowed = count <= self.times
+        if not allowed:
+            # Rejected requests don't take up a slot in the window
+            await self.redis.zrem(key, member)
+            count -= 1
+        return allowed, count, oldest[0][1] if oldest else now
+
+    async def hit(self, client: str) -> Tuple[bool, int, float]:
+        """Record a request from `client`: (allowed, requests in window, oldest request time)"""
+        now = time.time()
+        if self.redis is None:
+            return self._hit_local(client, now)
+        try:
+            return await self._hit_redis(client, now)
+        except Exception as e:
+            # Fall back to this worker's window rather than failing the request
+            logger.warning("Redis rate limit check failed for %s: %s", self._redis_key(client), e)
+            return self._hit_local(client, now)
+
+    async def __call__(self, request: Request, response: Response) -> None:
+        admin_token = settings.rate_limit_admin_token
+        if admin_token and secrets.compare_digest(request.headers.get("X-Admin-Token", ""), admin_token):
+            return
+
+        client = request.client.host if request.client else "unknown"
+        allowed, count, oldest = await self.hit(client)
+        reset = max(1, int(oldest + self.seconds - time.time()) + 1)
+        headers = {
+            "X-RateLimit-Limit": str(self.times),
+            "X-RateLimit-Remaining": str(max(0, self.times - count)),
+            "X-RateLimit-Reset": str(reset),
+        }
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: {self.times} requests per {self.seconds}s",
+                headers={**headers, "Retry-After": str(reset)},
+            )
+        response.headers.update(headers)
@@ -1,17 +1,27 @@
 """
 AI Rule Extraction Service - Extract lending rules from PDF text using AI
 """
-import json
+import hashlib
 import re
 from typing import Optional
 import httpx
+import orjson
 
-from app.config import get_settings
-from app.engine import EVALUATOR_REGISTRY
+from app.engine import get_rule_types
+from app.services.cache import ListingCache
 
+# Only this much of the PDF text is sent to Gemini
+MAX_PROMPT_TEXT = 15000
 
-# Get all available rule types
-AVAILABLE_RULE_TYPES = list(EVALUATOR_REGISTRY.keys())
+# Extractions keyed by the prompt input, so re-uploads of the same guidelines
+# skip the Gemini round-trip. The TTL bounds how long a stale extraction
+# (e.g. from an older prompt or model) can be served.
+_extraction_cache = ListingCache("extracted-rules", ttl=7 * 24 * 3600, local_ttl=24 * 3600, maxsize=64)
+
+# Gemini often wraps its JSON answer in a markdown code block
+_JSON_BLOCK_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+
+VALID_OPERATORS = frozenset({"gte", "lte", "eq", "neq", "in", "not_in"})
 
 EXTRACTION_PROMPT = """You are an expert at parsing lender credit policy documents.
 
@@ -74,8 +84,8 @@ async def extract_rules_with_gemini(text: str, api_key: str) -> dict:
         Structured lender data with programs and rules
     """
     prompt = EXTRACTION_PROMPT.format(
-        rule_types="\n".join(f"- {rt}" for rt in AVAILABLE_RULE_TYPES),
-        text=text[:15000]  # Limit text length for API
+        rule_types="\n".join(f"- {rt}" for rt in get_rule_types()),
+        text=text[:MAX_PROMPT_TEXT]  # Limit text length for API
     )
     
     async with httpx.AsyncClient(timeout=60.0) as client:
@@ -93,7 +103,7 @@ async def extract_rules_with_gemini(text: str, api_key: str) -> dict:
         if response.status_code != 200:
             raise Exception(f"Gemini API error: {response.status_code} - {response.text}")
         
-        result = response.json()
+        result = orjson.loads(response.content)
         
         # Extract the text response
         try:
@@ -102,16 +112,17 @@ async def extract_rules_with_gemini(text: str, api_key: str) -> dict:
             raise Exception("Invalid Gemini API response format")
         
         # Parse JSON from response (handle markdown code blocks)
-        json_match = re.search(r'```json\s*(.*?)\s*```', content, re.DOTALL)
+        json_match = _JSON_BLOCK_RE.search(content)
         if json_match:
             content = json_match.group(1)
         
-        # Also try to find raw JSON
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            content = json_match.group(0)
+        # Also try to find raw JSON: first "{" through last "}", without regex
+        # backtracking over long responses
+        start, end = content.find("{"), content.rfind("}")
+        if start != -1 and end > start:
+            content = content[start:end + 1]
         
-        return json.loads(content)
+        return orjson.loads(content)
 
 
 def validate_extracted_rules(data: dict) -> dict:
@@ -124,8 +135,7 @@ def validate_extracted_rules(data: dict) -> dict:
     Returns:
         Validated and cleaned data
     """
-    valid_rule_types = set(AVAILABLE_RULE_TYPES)
-    valid_operators = {"gte", "lte", "eq", "neq", "in", "not_in"}
+    valid_rule_types = set(get_rule_types())
     
     for program in data.get("programs", []):
         valid_rules = []
@@ -135,7 +145,7 @@ def validate_extracted_rules(data: dict) -> dict:
                 continue
             
             # Check operator is valid
-            if rule.get("operator") not in valid_operators:
+            if rule.get("operator") not in VALID_OPERATORS:
                 # Try to infer operator from rule type
                 if "min" in rule.get("rule_type", ""):
                     rule["operator"] = "gte"
@@ -162,6 +172,18 @@ def validate_extracted_rules(data: dict) -> dict:
     return data
 
 
+def _extraction_cache_key(text: str) -> str:
+    """
+    Hash of everything that shapes the extraction: the text Gemini would see
+    (whitespace-normalized, so re-exports of the same PDF still match) and
+    the rule types offered in the prompt.
+    """
+    normalized = " ".join(text[:MAX_PROMPT_TEXT].split())
+    digest = hashlib.sha256(normalized.encode())
+    digest.update("\n".join(get_rule_types()).encode())
+    return digest.hexdigest()
+
+
 async def extract_rules_from_text(text: str, api_key: str) -> dict:
     """
     Main entry point for rule extraction.
@@ -173,6 +195,13 @@ async def extract_rules_from_text(text: str, api_key: str) -> dict:
     Returns:
         Validated lender data with programs and rules
     """
+    cache_key = _extraction_cache_key(text)
+    generation = await _extraction_cache.generation()
+    cached = await _extraction_cache.get(cache_key, generation)
+    if cached is not None:
+        return cached
+    
     raw_data = await extract_rules_with_gemini(text, api_key)
     validated_data = validate_extracted_rules(raw_data)
+    await _extraction_cache.set(cache_key, validated_data, generation)
     return validated_data
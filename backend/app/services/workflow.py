@@ -6,56 +6,99 @@ This module orchestrates the loan underwriting process:
 - Evaluates against all lenders
 - Persists match results
 """
+import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import uuid
 
+from sqlalchemy.orm import Session, selectinload
+
 from app.database import SessionLocal
-from app.models import LoanApplication, ApplicationStatus, MatchResult
+from app.models import Borrower, LoanApplication, ApplicationStatus, MatchResult
 from app.engine import LenderMatcher
 
+logger = logging.getLogger(__name__)
+
+
+def _restore_status(
+    db: Session,
+    app_uuid: uuid.UUID,
+    previous_status: Optional[ApplicationStatus],
+    error: str,
+) -> None:
+    """
+    Put a failed run's application back to the status it had before the run,
+    so pollers waiting on "underwriting" stop, and record why it failed so
+    /results can report it.
+    """
+    try:
+        application = db.get(LoanApplication, app_uuid)
+        if application is None:
+            return
+        if previous_status in (None, ApplicationStatus.UNDERWRITING):
+            # Unknown, or left behind by an earlier run that never finished
+            previous_status = (
+                ApplicationStatus.COMPLETED
+                if application.underwriting_completed_at
+                else ApplicationStatus.DRAFT
+            )
+        application.status = previous_status
+        application.underwriting_error = error[:500]
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Could not reset the status of application %s", app_uuid)
+
 
-def run_underwriting(application_id: str) -> Dict[str, Any]:
+def run_underwriting(
+    application_id: str,
+    previous_status: Optional[ApplicationStatus] = None,
+) -> Dict[str, Any]:
     """
     Run the underwriting process for a loan application.
     
     Evaluates the application against all active lenders and persists results.
+    previous_status is the status the application had before it was queued;
+    if the run fails, the application goes back to it (previous results are
+    kept, since clearing them is part of the rolled-back transaction) and
+    underwriting_error says why.
     """
-    db = SessionLocal()
+    # Keep match results (and their lender/program) loaded across commits for the response
+    db = SessionLocal(expire_on_commit=False)
+    app_uuid = None
     try:
-        # Get application
+        # Get application with everything build_context reads
         app_uuid = uuid.UUID(application_id)
-        application = db.query(LoanApplication).filter(
-            LoanApplication.id == app_uuid
-        ).first()
+        application = db.get(
+            LoanApplication, app_uuid,
+            options=[selectinload(LoanApplication.borrower).selectinload(Borrower.guarantors)],
+        )
         
         if not application:
             return {"error": f"Application {application_id} not found"}
         
-        # Update status to underwriting
+        if previous_status is None:
+            previous_status = application.status
+        
+        # Update status to underwriting (the API has already committed this for
+        # queued runs, so it rides along with the results below)
         application.status = ApplicationStatus.UNDERWRITING
-        db.commit()
         
-        # Clear any existing results
+        # Clear any existing results in the same transaction that inserts the
+        # new ones, so a failed run leaves the previous results in place
         db.query(MatchResult).filter(
             MatchResult.application_id == app_uuid
-        ).delete()
-        db.commit()
+        ).delete(synchronize_session=False)
         
         # Run matching
         matcher = LenderMatcher(db)
         results = matcher.match_application(application)
         
-        # Update status to completed
-        application.status = ApplicationStatus.COMPLETED
-        application.underwriting_completed_at = datetime.utcnow()
-        db.commit()
-        
         # Build response
         eligible = [r for r in results if r.is_eligible]
         ineligible = [r for r in results if not r.is_eligible]
         
-        return {
+        response = {
             "application_id": str(application_id),
             "status": "completed",
             "total_lenders": len(results),
@@ -74,5 +117,20 @@ def run_underwriting(application_id: str) -> Dict[str, Any]:
             ]
         }
         
+        # Update status to completed
+        application.status = ApplicationStatus.COMPLETED
+        application.underwriting_completed_at = datetime.utcnow()
+        application.underwriting_error = None
+        db.commit()
+        
+        return response
+    
+    except Exception as e:
+        # Runs as a background task - don't leave pollers waiting forever
+        db.rollback()
+        if app_uuid is not None:
+            _restore_status(db, app_uuid, previous_status, f"Underwriting failed: {e}")
+        raise
+        
     finally:
         db.close()
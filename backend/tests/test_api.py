@@ -1,17 +1,73 @@
 """
 API Integration Tests for the Lender Matching Platform
 """
+import asyncio
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from unittest.mock import patch, MagicMock
 from uuid import uuid4
 
 from app.main import app
+from app.database import async_engine
+from app.api.lenders import _invalidate_lender_cache, _pdf_rate_limit
 
 
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module", autouse=True)
+def client_lifespan():
+    """Run all requests on one event loop (asyncpg connections are loop-bound)"""
+    with client:
+        yield
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements the API sends while the block runs"""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+APPLICATION_PAYLOAD = {
+    "borrower": {
+        "business_name": "Test Borrower",
+        "industry": "construction",
+        "state": "TX",
+        "years_in_business": 6,
+        "annual_revenue": 900000,
+        "guarantors": [
+            {"first_name": "Pat", "last_name": "Lee", "ownership_percentage": 100, "fico_score": 740, "is_homeowner": True},
+        ],
+    },
+    "application": {
+        "amount_requested": 80000,
+        "term_months": 48,
+        "equipment_type": "Excavator",
+        "equipment_year": 2021,
+        "equipment_age_years": 3,
+        "paynet_score": 700,
+    },
+}
+
+
+def create_application() -> str:
+    """Create a draft application and return its id"""
+    response = client.post("/api/applications", json=APPLICATION_PAYLOAD)
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
 # ============== Lender API Tests ==============
 
 class TestLenderAPI:
@@ -42,6 +98,144 @@ class TestLenderAPI:
         
         assert response.status_code == 404
         assert "not found" in response.json()["detail"].lower()
+    
+    def test_lender_conditional_get(self):
+        """GET /api/lenders and /api/lenders/{id} should answer a matching If-None-Match with 304"""
+        listing = client.get("/api/lenders")
+        etag = listing.headers["ETag"]
+        
+        response = client.get("/api/lenders", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        
+        if not listing.json():
+            pytest.skip("no lenders seeded")
+        url = f"/api/lenders/{listing.json()[0]['id']}"
+        etag = client.get(url).headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        assert client.get(url, headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+    
+    def test_parse_pdf_rate_limited(self):
+        """POST /api/lenders/parse-pdf should return 429 once the per-IP limit is spent"""
+        _pdf_rate_limit.local.clear()
+        upload = {"file": ("notes.txt", b"not a pdf", "text/plain")}
+        
+        for _ in range(_pdf_rate_limit.times):
+            response = client.post("/api/lenders/parse-pdf", files=upload)
+            assert response.status_code == 400
+        
+        response = client.post("/api/lenders/parse-pdf", files=upload)
+        assert response.status_code == 429
+        assert response.headers["X-RateLimit-Remaining"] == "0"
+        assert "Retry-After" in response.headers
+
+
+class TestModelRepr:
+    
+    def test_repr_does_not_touch_unloaded_relationships(self):
+        """repr() works on rows whose lender relationship isn't loaded (lazy="raise_on_sql")"""
+        from sqlalchemy import select
+        from app.database import SessionLocal
+        from app.models import LenderProgram, MatchResult
+        
+        application_id = create_application()
+        assert client.post(f"/api/applications/{application_id}/underwrite").status_code == 202
+        
+        with SessionLocal() as db:
+            program = db.scalars(select(LenderProgram).limit(1)).first()
+            result = db.scalars(select(MatchResult).limit(1)).first()
+            
+            assert program.name in repr(program)
+            assert str(result.lender_id) in repr(result)
+
+
+class TestLenderDeletes:
+    
+    def test_delete_cascades_to_programs_rules_and_results(self):
+        """Deleting a program removes its rules and unlinks match results; deleting the lender removes the rest"""
+        rule = {"rule_type": "fico_min", "operator": "gte", "value": 600, "rejection_message": "FICO too low"}
+        lender = client.post("/api/lenders", json={
+            "name": f"Cascade Lender {uuid4()}",
+            "programs": [{"name": "Tier 1", "rules": [rule]}, {"name": "Tier 2", "rules": [rule]}],
+        }).json()
+        application_id = create_application()
+        assert client.post(f"/api/applications/{application_id}/underwrite").status_code == 202
+        
+        def lender_result():
+            results = client.get(f"/api/applications/{application_id}/results").json()["results"]
+            return next((r for r in results if r["lender_id"] == lender["id"]), None)
+        
+        program_id = lender_result()["program_id"]
+        assert program_id is not None
+        other_program_id = next(p["id"] for p in lender["programs"] if p["id"] != program_id)
+        
+        assert client.delete(f"/api/lenders/programs/{program_id}").status_code == 204
+        assert client.get(f"/api/lenders/programs/{program_id}/rules").status_code == 404
+        assert lender_result()["program_id"] is None
+        
+        assert client.delete(f"/api/lenders/{lender['id']}").status_code == 204
+        assert client.get(f"/api/lenders/{lender['id']}").status_code == 404
+        assert client.get(f"/api/lenders/programs/{other_program_id}/rules").status_code == 404
+        assert lender_result() is None
+
+
+# ============== Listing Cache Tests ==============
+
+class TestListingCache:
+    
+    def test_listing_built_during_clear_is_not_cached(self):
+        """A set() under a generation that clear() has since bumped is dropped"""
+        from app.services.cache import ListingCache
+        
+        async def scenario():
+            cache = ListingCache("test-listing", ttl=30, local_ttl=30)
+            generation = await cache.generation()
+            await cache.clear()  # a write lands while the listing is being queried
+            await cache.set("all", ["stale"], generation)
+            
+            current = await cache.generation()
+            assert current != generation
+            assert await cache.get("all", current) is None
+            
+            await cache.set("all", ["fresh"], current)
+            assert await cache.get("all", current) == ["fresh"]
+        
+        asyncio.run(scenario())
+    
+    def test_invalidation_changes_listing_etag(self):
+        """The lender-list ETag is tied to the cache generation"""
+        etag = client.get("/api/lenders").headers["ETag"]
+        asyncio.run(_invalidate_lender_cache())
+        
+        response = client.get("/api/lenders", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+
+# ============== Query Count Tests ==============
+
+class TestQueryCounts:
+    
+    def test_list_lenders_single_query(self):
+        """Program counts come from the same query as the lenders (no N+1)"""
+        asyncio.run(_invalidate_lender_cache())
+        with count_queries() as statements:
+            response = client.get("/api/lenders")
+        
+        assert response.status_code == 200
+        assert len(statements) == 1
+    
+    def test_get_lender_tree_constant_queries(self):
+        """Lender, programs and rules load in one query per level"""
+        lenders = client.get("/api/lenders").json()
+        if not lenders:
+            pytest.skip("no lenders seeded")
+        
+        with count_queries() as statements:
+            response = client.get(f"/api/lenders/{lenders[0]['id']}")
+        
+        assert response.status_code == 200
+        assert len(statements) <= 3
 
 
 # ============== Application API Tests ==============
@@ -65,6 +259,160 @@ class TestApplicationAPI:
         response = client.get(f"/api/applications/{fake_id}")
         
         assert response.status_code == 404
+    
+    def test_cursor_pagination_round_trip(self):
+        """Following X-Next-Cursor visits every application once, in order, even with tied created_at"""
+        from datetime import datetime
+        from sqlalchemy import update
+        from app.database import SessionLocal
+        from app.models import LoanApplication
+        
+        tied_ids = [create_application() for _ in range(5)]
+        with SessionLocal() as db:
+            db.execute(
+                update(LoanApplication)
+                .where(LoanApplication.id.in_(tied_ids))
+                .values(created_at=datetime(2024, 1, 1, 12, 0, 0))
+            )
+            db.commit()
+        
+        expected = [a["id"] for a in client.get("/api/applications", params={"limit": 1000}).json()]
+        
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/applications", params=params)
+            assert response.status_code == 200
+            seen += [a["id"] for a in response.json()]
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+        
+        assert pages >= 3
+        assert seen == expected
+        assert set(tied_ids) <= set(seen)
+    
+    def test_malformed_cursor_rejected(self):
+        """A cursor that doesn't decode to (created_at, id) is a 400, not a 500"""
+        import base64
+        
+        for cursor in ["not-a-cursor", base64.urlsafe_b64encode(b"2024-01-01|not-a-uuid").decode()]:
+            response = client.get("/api/applications", params={"cursor": cursor})
+            assert response.status_code == 400, cursor
+            assert "cursor" in response.json()["detail"].lower()
+
+
+class TestUnderwriting:
+    
+    def test_underwrite_is_queued(self):
+        """POST /underwrite answers 202 and the run completes in the background"""
+        application_id = create_application()
+        
+        response = client.post(f"/api/applications/{application_id}/underwrite")
+        
+        assert response.status_code == 202
+        assert response.json() == {"application_id": application_id, "status": "queued"}
+        assert client.get(f"/api/applications/{application_id}/results").json()["status"] == "completed"
+    
+    def test_failed_run_restores_previous_status(self):
+        """A failing run never leaves the application stuck in "underwriting" (which the UI polls on), and /results reports it"""
+        from sqlalchemy.orm import Query
+        from app.engine import LenderMatcher
+        
+        application_id = create_application()
+        url = f"/api/applications/{application_id}"
+        
+        # Fails before matching starts: back to draft
+        with patch.object(Query, "delete", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                client.post(f"{url}/underwrite")
+        assert client.get(url).json()["status"] == "draft"
+        failed = client.get(f"{url}/results").json()
+        assert failed["status"] == "draft"
+        assert "boom" in failed["error"]
+        
+        # A successful run clears the error
+        assert client.post(f"{url}/underwrite").status_code == 202
+        first = client.get(f"{url}/results").json()
+        assert first["status"] == "completed" and first["total_lenders"] > 0
+        assert first["error"] is None
+        
+        # A failing re-run keeps the completed status and the previous results
+        with patch.object(LenderMatcher, "match_application", side_effect=RuntimeError("boom")):
+            with pytest.raises(RuntimeError):
+                client.post(f"{url}/underwrite")
+        again = client.get(f"{url}/results").json()
+        assert again["status"] == "completed"
+        assert again["total_lenders"] == first["total_lenders"]
+        assert "boom" in again["error"]
+
+
+class TestResults:
+    
+    def test_stream_matches_results(self):
+        """/results/stream carries the same summary and rows, in the same order, as /results"""
+        import json
+        
+        application_id = create_application()
+        assert client.post(f"/api/applications/{application_id}/underwrite").status_code == 202
+        
+        full = client.get(f"/api/applications/{application_id}/results").json()
+        response = client.get(f"/api/applications/{application_id}/results/stream")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        summary, *rows = [json.loads(line) for line in response.text.splitlines()]
+        
+        assert full["total_lenders"] > 0
+        assert summary == {
+            key: full[key]
+            for key in ("application_id", "status", "total_lenders", "eligible_count", "ineligible_count", "error")
+        }
+        assert rows == full["results"]
+    
+    def test_stream_is_one_snapshot(self):
+        """Results replaced after the summary is read don't leak into the streamed rows"""
+        import json
+        from sqlalchemy import delete
+        from app.api import applications
+        from app.database import SessionLocal
+        from app.models import MatchResult
+        
+        application_id = create_application()
+        assert client.post(f"/api/applications/{application_id}/underwrite").status_code == 202
+        count_results = applications._count_results
+        
+        async def count_then_clear(db, app_id):
+            counts = await count_results(db, app_id)
+            # A concurrent re-run commits between the summary and the rows
+            with SessionLocal() as other:
+                other.execute(delete(MatchResult).where(MatchResult.application_id == app_id))
+                other.commit()
+            return counts
+        
+        with patch.object(applications, "_count_results", count_then_clear):
+            response = client.get(f"/api/applications/{application_id}/results/stream")
+        summary, *rows = [json.loads(line) for line in response.text.splitlines()]
+        
+        assert summary["total_lenders"] > 0
+        assert len(rows) == summary["total_lenders"]
+    
+    def test_summary_omits_rule_details(self):
+        """summary=true drops the per-lender results but keeps the counts and best match"""
+        application_id = create_application()
+        assert client.post(f"/api/applications/{application_id}/underwrite").status_code == 202
+        url = f"/api/applications/{application_id}/results"
+        
+        full = client.get(url).json()
+        summary = client.get(url, params={"summary": "true"}).json()
+        
+        assert full["results"] and full["best_match"]
+        assert summary["results"] == []
+        for key in ("status", "total_lenders", "eligible_count", "ineligible_count"):
+            assert summary[key] == full[key]
+        assert summary["best_match"]["id"] == full["best_match"]["id"]
+        assert summary["best_match"]["fit_score"] == full["best_match"]["fit_score"]
 
 
 # ============== Health Check Tests ==============
@@ -117,5 +465,6 @@ class TestRuleTypesCoverage:
         assert any("private_party" in r or "refinance" in r for r in rule_types)
 
 
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -17,7 +17,11 @@ from app.engine.evaluators import (
     BankruptcyYearsMinEvaluator,
     RequiresHomeownerEvaluator,
     AmountMaxEvaluator,
+    SKIPPED_REASON,
+    evaluate_rules,
     get_evaluator,
+    get_rule_types,
+    register_evaluator,
     EVALUATOR_REGISTRY,
 )
 from app.engine.scoring import calculate_fit_score
@@ -36,6 +40,7 @@ def create_test_context(
     is_homeowner: bool = True,
     has_bankruptcy: bool = False,
     bankruptcy_discharge_date: date | None = None,
+    reference_date: date | None = None,
 ) -> EvaluationContext:
     """Create a test evaluation context with default good values"""
     return EvaluationContext(
@@ -72,6 +77,7 @@ def create_test_context(
         is_sale_leaseback=False,
         paynet_score=paynet,
         comparable_credit_pct=Decimal("80"),
+        reference_date=reference_date,
     )
 
 
@@ -338,6 +344,21 @@ class TestBankruptcyYearsMinEvaluator:
         
         assert result.passed is False
         assert result.actual_value == 3
+    
+    def test_bankruptcy_age_uses_reference_date(self):
+        """Bankruptcy age is measured at the context's reference date"""
+        ctx = create_test_context(
+            has_bankruptcy=True,
+            bankruptcy_discharge_date=date(2015, 6, 1),
+            reference_date=date(2022, 6, 1),
+        )
+        rule = create_test_rule("bankruptcy_years_min", RuleOperator.GTE, 7)
+        evaluator = BankruptcyYearsMinEvaluator()
+        
+        result = evaluator.evaluate(ctx, rule)
+        
+        assert result.passed is True
+        assert result.actual_value == 7
 
 
 # ============== Amount Tests ==============
@@ -410,6 +431,60 @@ class TestEvaluatorRegistry:
         """Unknown rule type should return None"""
         evaluator = get_evaluator("unknown_rule_type")
         assert evaluator is None
+    
+    def test_rule_types_refresh_on_register(self):
+        """Memoized rule types should pick up newly registered evaluators"""
+        assert "custom_test_rule" not in get_rule_types()
+        
+        register_evaluator("custom_test_rule", FicoMinEvaluator())
+        try:
+            assert "custom_test_rule" in get_rule_types()
+        finally:
+            del EVALUATOR_REGISTRY["custom_test_rule"]
+            get_rule_types.cache_clear()
+    
+    def test_unknown_rule_type_warns_once(self, caplog):
+        """Unknown rule types are skipped and logged once, not once per rule"""
+        ctx = create_test_context()
+        rules = [create_test_rule("unknown_warn_once_type", RuleOperator.GTE, 1)] * 3
+        
+        with caplog.at_level("WARNING", logger="app.engine.evaluators"):
+            assert evaluate_rules(ctx, rules) == []
+            assert evaluate_rules(ctx, rules) == []
+        
+        assert sum("unknown_warn_once_type" in m for m in caplog.messages) == 1
+    
+    def test_evaluate_rules_stops_on_required_fail(self):
+        """Rules after a failed required rule are skipped only when asked to"""
+        ctx = create_test_context(fico=650, tib=1)
+        rules = [
+            create_test_rule("fico_min", RuleOperator.GTE, 700),
+            create_test_rule("tib_min", RuleOperator.GTE, 3),
+            create_test_rule("unknown_rule_type", RuleOperator.GTE, 1),
+        ]
+        
+        full = evaluate_rules(ctx, rules)
+        short = evaluate_rules(ctx, rules, stop_on_required_fail=True)
+        
+        assert [r.passed for r in full] == [False, False]
+        assert full[1].reason != SKIPPED_REASON
+        assert len(short) == 2
+        assert short[0] == full[0]
+        assert short[1].reason == SKIPPED_REASON
+    
+    def test_evaluate_rules_keeps_rule_order(self):
+        """Required rules run first when stopping early, but results follow rule order"""
+        ctx = create_test_context(fico=650)
+        rules = [
+            create_test_rule("tib_min", RuleOperator.GTE, 3, is_required=False),
+            create_test_rule("fico_min", RuleOperator.GTE, 700),
+            create_test_rule("paynet_min", RuleOperator.GTE, 600),
+        ]
+        
+        results = evaluate_rules(ctx, rules, stop_on_required_fail=True)
+        
+        assert [r.rule_type for r in results] == ["tib_min", "fico_min", "paynet_min"]
+        assert [r.reason == SKIPPED_REASON for r in results] == [True, False, True]
 
 
 # ============== Scoring Tests ==============
@@ -463,6 +538,23 @@ class TestFitScoreCalculation:
         """Zero score with no results"""
         score = calculate_fit_score([])
         assert score == 0
+    
+    def test_program_score_matches_calculate_fit_score(self):
+        """evaluate_program scores from its own totals; it must agree with calculate_fit_score"""
+        from app.engine.matcher import LenderMatcher
+        from app.models import LenderProgram
+        
+        ctx = create_test_context(fico=650, tib=5)
+        program = LenderProgram(rules=[
+            create_test_rule("fico_min", RuleOperator.GTE, 700, is_required=False),
+            create_test_rule("tib_min", RuleOperator.GTE, 3),
+            create_test_rule("paynet_min", RuleOperator.GTE, 600),
+        ])
+        
+        evaluation = LenderMatcher(db=None).evaluate_program(ctx, program)
+        
+        assert evaluation.fit_score == calculate_fit_score(evaluation.results)
+        assert (evaluation.passed_count, evaluation.failed_count) == (2, 1)
 
 
 if __name__ == "__main__":
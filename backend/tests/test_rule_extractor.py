@@ -0,0 +1,27 @@
+"""
+Unit tests for the rule extraction service (no database or Gemini calls)
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+from uuid import uuid4
+
+from app.services import rule_extractor
+
+
+class TestRuleExtractionCache:
+    
+    def test_reupload_skips_gemini(self):
+        """Re-extracting the same guideline text (modulo whitespace) should reuse the first result"""
+        extracted = {"lender_name": "Test Lender", "programs": []}
+        text = f"Minimum FICO 700. {uuid4()}"
+        with patch.object(rule_extractor, "extract_rules_with_gemini", return_value=extracted) as gemini:
+            first = asyncio.run(rule_extractor.extract_rules_from_text(text, "key"))
+            second = asyncio.run(rule_extractor.extract_rules_from_text(f"  {text}\n", "key"))
+        
+        assert gemini.call_count == 1
+        assert first == second == extracted
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -2,6 +2,10 @@ import { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { getApplication, getResults, UnderwritingResults, MatchResult, LoanApplication } from '../services/api';
 
+// Give up polling a background run after about a minute
+const POLL_INTERVAL_MS = 1000;
+const MAX_POLLS = 60;
+
 function ScoreCircle({ score }: { score: number }) {
     const getScoreClass = () => {
         if (score >= 80) return 'score-high';
@@ -118,24 +122,50 @@ export function ApplicationResults() {
     const [results, setResults] = useState<UnderwritingResults | null>(null);
 
     useEffect(() => {
+        let cancelled = false;
+
         const fetchData = async () => {
             if (!id) return;
 
             try {
-                const [appData, resultsData] = await Promise.all([
+                const [appData, initialResults] = await Promise.all([
                     getApplication(id),
                     getResults(id)
                 ]);
+                let resultsData = initialResults;
+                // Underwriting runs in the background - poll until it finishes
+                let polls = 0;
+                while (resultsData.status === 'underwriting' && polls < MAX_POLLS && !cancelled) {
+                    await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+                    resultsData = await getResults(id);
+                    polls++;
+                }
+                if (cancelled) return;
+                if (resultsData.status === 'underwriting') {
+                    setError('Underwriting is still running. Refresh this page in a minute to see the results.');
+                    return;
+                }
+                if (resultsData.error) {
+                    setError(resultsData.error);
+                    return;
+                }
                 setApplication(appData);
                 setResults(resultsData);
             } catch (err) {
-                setError(err instanceof Error ? err.message : 'Failed to load results');
+                if (!cancelled) {
+                    setError(err instanceof Error ? err.message : 'Failed to load results');
+                }
             } finally {
-                setLoading(false);
+                if (!cancelled) {
+                    setLoading(false);
+                }
             }
         };
 
         fetchData();
+        return () => {
+            cancelled = true;
+        };
     }, [id]);
 
     if (loading) {
@@ -170,6 +170,7 @@ export interface UnderwritingResults {
   ineligible_count: number;
   best_match?: MatchResult;
   results: MatchResult[];
+  error?: string | null;  // why the last run failed, if it did
 }
 
 // API Functions
@@ -203,6 +204,7 @@ export async function getApplication(id: string): Promise<LoanApplication> {
   return handleResponse<LoanApplication>(response);
 }
 
+// Underwriting is queued server-side (202); poll getResults until status is no longer "underwriting"
 export async function runUnderwriting(applicationId: string): Promise<any> {
   const response = await fetch(`${API_BASE_URL}/applications/${applicationId}/underwrite`, {
     method: 'POST',